@@ -3,9 +3,27 @@ from typing import Optional, List
 import os
 
 class Settings(BaseSettings):
+    # Almacenamiento: mongo (Atlas) o sqlite (embebido)
+    STORAGE_BACKEND: str = "mongo"
+    SQLITE_PATH: str = "ppt_game.db"  # ":memory:" para una base en memoria
+    
     # MongoDB - CRÍTICO: Nunca exponer en código
-    MONGODB_URI: str
+    # Requerido solo con STORAGE_BACKEND=mongo
+    MONGODB_URI: str = ""
     DATABASE_NAME: str = "ppt_game"
+    # Pool de conexiones (escrituras e índices, siempre al primario)
+    MONGODB_MAX_POOL_SIZE: int = 10
+    MONGODB_MIN_POOL_SIZE: int = 1  # Conexiones que se abren al iniciar
+    MONGODB_MAX_IDLE_TIME_MS: int = 45000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 0  # 0 = esperar sin límite
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    # Lecturas del leaderboard: pool propio y preferencia de lectura
+    # (primary, primaryPreferred, secondary, secondaryPreferred, nearest)
+    MONGODB_SEPARATE_READ_POOL: bool = True
+    MONGODB_READ_MAX_POOL_SIZE: int = 10
+    MONGODB_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_MAX_STALENESS_SECONDS: int = 90  # -1 = sin límite; mínimo 90
     
     # API
     API_V1_STR: str = "/api"
@@ -20,19 +38,109 @@ class Settings(BaseSettings):
     MAX_REQUESTS_PER_MINUTE: int = 60
     MAX_GAME_PLAYS_PER_MINUTE: int = 30
     MAX_LEADERBOARD_SAVES_PER_MINUTE: int = 10
+    MAX_BATCH_ROUNDS_PER_MINUTE: int = 3000  # Cada ronda de un lote cuenta
+    # Storage de límites: memory (ventana deslizante del proceso),
+    # mmap (compartida entre workers del host) o slowapi (storage original)
+    RATE_LIMIT_STORAGE: str = "memory"
+    RATE_LIMIT_MMAP_PATH: str = "/dev/shm/ppt-rate-limit"
+    RATE_LIMIT_MAX_KEYS: int = 65536
+    RATE_LIMIT_SWEEP_SECONDS: int = 60
     
     # Security Headers
     SECURITY_HEADERS_ENABLED: bool = True
     
+    # Métricas Prometheus en /metrics
+    METRICS_ENABLED: bool = True
+    
+    # Logs: se escriben desde un hilo aparte, sin bloquear el event loop
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json (una línea por registro) o text
+    LOG_QUEUE_SIZE: int = 10000  # Con la cola llena se descartan registros
+    # Advertencias/errores iguales: como máximo BURST por ventana
+    LOG_SAMPLE_BURST: int = 10
+    LOG_SAMPLE_WINDOW_SECONDS: int = 60
+    
     # Input Validation
     MAX_PLAYER_NAME_LENGTH: int = 5
     MIN_PLAYER_NAME_LENGTH: int = 1
-    ALLOWED_GAME_MODES: List[str] = ["normal", "imposible"]
+    ALLOWED_GAME_MODES: List[str] = ["normal", "imposible", "adaptativo"]
     ALLOWED_MOVES: List[int] = [1, 2, 3]
+    MAX_BATCH_PLAY_SIZE: int = 1000
+    # /play valida una sola vez y responde con cuerpos precodificados
+    PLAY_FAST_PATH_ENABLED: bool = True
+    
+    # Partidas del servidor (en memoria, con TTL y desalojo LRU)
+    MATCH_TTL_SECONDS: int = 900
+    MAX_ACTIVE_MATCHES: int = 50000
+    
+    # Modo adaptativo: historial de jugadas por jugador (por IP fuera de
+    # una partida) para predecir su próxima jugada
+    ADAPTIVE_ORDER: int = 2  # Jugadas previas que forman el contexto (3^k filas)
+    ADAPTIVE_TTL_SECONDS: int = 1800
+    ADAPTIVE_MAX_PLAYERS: int = 100000
+    
+    # Idempotency-Key al guardar puntuaciones: resultados recientes en
+    # memoria (LRU con TTL) y, opcionalmente, índice único para que un
+    # reintento que llega a otra instancia tampoco duplique la entrada
+    IDEMPOTENCY_TTL_SECONDS: int = 3600
+    IDEMPOTENCY_MAX_KEYS: int = 50000
+    IDEMPOTENCY_KEY_MAX_LENGTH: int = 128
+    IDEMPOTENCY_UNIQUE_INDEX: bool = True
+    
+    # WebSocket de juego
+    WS_IDLE_TIMEOUT_SECONDS: int = 120
+    WS_MAX_MESSAGE_BYTES: int = 4096
     
     # MongoDB Indexes
     CREATE_INDEXES_ON_STARTUP: bool = True
     
+    # Caché del leaderboard (top-N en memoria por modo)
+    LEADERBOARD_CACHE_ENABLED: bool = True
+    LEADERBOARD_CACHE_SIZE: int = 100
+    LEADERBOARD_CACHE_REFRESH_SECONDS: int = 300
+    
+    # Leaderboards diario y semanal: las puntuaciones recientes expiran
+    # (índice TTL) tras este número de días; debe cubrir una semana completa
+    LEADERBOARD_WINDOW_RETENTION_DAYS: int = 8
+    # Cache-Control del GET del leaderboard (navegadores y CDNs)
+    LEADERBOARD_HTTP_MAX_AGE_SECONDS: int = 5
+    
+    # Stream SSE del leaderboard (/api/leaderboard/{mode}/stream)
+    SSE_MAX_SUBSCRIBERS: int = 5000  # Por proceso
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_MIN_INTERVAL_MS: int = 250  # Agrupa ráfagas de cambios en un solo evento
+    SSE_MAX_DURATION_SECONDS: int = 300  # Luego el cliente reconecta solo
+    SSE_RETRY_MS: int = 2000  # Espera sugerida al cliente antes de reconectar
+    # Escuchar inserciones de otras instancias con change streams de MongoDB
+    LEADERBOARD_CHANGE_STREAM_ENABLED: bool = False
+    
+    # Posición de jugadores (histograma de puntuaciones por modo)
+    RANK_INDEX_ENABLED: bool = True
+    RANK_INDEX_REFRESH_SECONDS: int = 300
+    
+    # Escrituras agrupadas del leaderboard (insert_many por lotes)
+    WRITE_BUFFER_ENABLED: bool = True
+    WRITE_BUFFER_BATCH_SIZE: int = 100
+    WRITE_BUFFER_FLUSH_INTERVAL_MS: int = 50  # Tope de acumulación bajo carga; en reposo no se espera
+    WRITE_BUFFER_MAX_QUEUE: int = 5000
+    WRITE_BUFFER_PUT_TIMEOUT_MS: int = 2000
+    
+    # Estadísticas globales de juego (/api/game/stats): contadores en
+    # memoria que se suman a la base cada GAME_STATS_FLUSH_SECONDS
+    GAME_STATS_ENABLED: bool = True
+    GAME_STATS_FLUSH_SECONDS: int = 10
+    
+    # Compactación del historial: mueve a leaderboard_<modo>_archive las
+    # entradas fuera del top, que no son la mejor de su jugador y más
+    # antiguas que la retención (también: python -m app.services.compaction)
+    COMPACTION_ENABLED: bool = False
+    COMPACTION_INTERVAL_SECONDS: int = 86400
+    COMPACTION_RETENTION_DAYS: int = 30
+    COMPACTION_KEEP_TOP: int = 1000  # Nunca menos que LEADERBOARD_CACHE_SIZE
+    COMPACTION_BATCH_SIZE: int = 500
+    COMPACTION_BATCH_PAUSE_MS: int = 200
+    COMPACTION_MAX_ROWS_PER_RUN: int = 100000
+    
     @property
     def is_production(self) -> bool:
         return self.ENVIRONMENT.lower() == "production"
@@ -1,12 +1,38 @@
+import logging
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi.errors import RateLimitExceeded
 from app.config import settings
-from app.services.database import connect_to_mongo, close_mongo_connection
-from app.routes import game, leaderboard
-from app.middleware.rate_limiter import limiter, rate_limit_exceeded_handler
+from app.services.database import (
+    connect_to_database,
+    close_database_connection,
+    start_warm_up,
+    stop_warm_up,
+    readiness,
+    stop_leaderboard_cache,
+    stop_rank_index,
+    stop_change_stream,
+    leaderboard_events,
+    start_write_buffer,
+    stop_write_buffer,
+    start_game_stats,
+    stop_game_stats,
+    stop_compaction,
+)
+from app.routes import game, game_ws, leaderboard
+from app.middleware.rate_limiter import limiter, rate_limit_exceeded_handler, rate_limit_stats
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.security_headers import SecurityHeadersMiddleware, security_headers
+from app.middleware.request_id import RequestIdMiddleware
+from app.services.metrics import metrics
+from app.services.log import setup_logging, stop_logging, log_stats
+from app.services.session_store import match_store, predictor_store, idempotency_store
+from app.services import database
+from app.services import compaction
+
+logger = logging.getLogger(__name__)
 
 # Crear instancia de FastAPI
 app = FastAPI(
@@ -30,28 +56,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "Idempotent-Replayed", "X-Next-Cursor"],
     max_age=600,
 )
 
-# Security Headers Middleware
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    
-    if settings.SECURITY_HEADERS_ENABLED:
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # CSP más permisivo en producción para evitar problemas
-        if settings.is_production:
-            response.headers["Content-Security-Policy"] = "default-src 'self' 'unsafe-inline' 'unsafe-eval' *"
-        
-        if settings.is_production:
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    
-    return response
+# Security Headers Middleware (lista construida una sola vez)
+if settings.SECURITY_HEADERS_ENABLED:
+    app.add_middleware(
+        SecurityHeadersMiddleware,
+        headers=security_headers(settings.is_production)
+    )
 
 # Trusted Host Middleware (prevenir ataques de Host Header)
 if settings.is_production:
@@ -64,28 +78,97 @@ if settings.is_production:
             "127.0.0.1"
         ]
     )
+
+# Id por solicitud (X-Request-ID) para correlacionar los logs
+app.add_middleware(RequestIdMiddleware)
+
+# Métricas (el más externo, para medir toda la cadena de middlewares)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    metrics.register_gauge(
+        "ppt_rate_limit_keys", "Claves activas en el storage de rate limit",
+        lambda: rate_limit_stats().get("keys", 0)
+    )
+    metrics.register_gauge(
+        "ppt_rate_limit_memory_bytes", "Memoria del storage de rate limit",
+        lambda: rate_limit_stats().get("memory_bytes", 0)
+    )
+    metrics.register_gauge(
+        "ppt_active_matches", "Partidas activas en memoria",
+        lambda: len(match_store)
+    )
+    metrics.register_gauge(
+        "ppt_adaptive_players", "Historiales del modo adaptativo en memoria",
+        lambda: len(predictor_store)
+    )
+    metrics.register_gauge(
+        "ppt_idempotency_keys", "Idempotency-Key recientes en memoria",
+        lambda: len(idempotency_store)
+    )
+    metrics.register_gauge(
+        "ppt_sse_subscribers", "Clientes conectados al stream del leaderboard",
+        lambda: database.leaderboard_events.subscribers
+    )
+    metrics.register_counter(
+        "ppt_log_records_dropped_total", "Registros de log descartados con la cola llena",
+        lambda: log_stats().get("dropped", 0)
+    )
+    metrics.register_counter(
+        "ppt_log_records_suppressed_total", "Advertencias/errores repetidos omitidos por muestreo",
+        lambda: log_stats().get("suppressed", 0)
+    )
+    metrics.register_counter(
+        "ppt_compaction_rows_archived_total", "Entradas del historial movidas al archivo",
+        lambda: compaction.totals["rows_archived"]
+    )
+    metrics.register_counter(
+        "ppt_compaction_bytes_freed_total", "Bytes del historial liberados por la compactación",
+        lambda: compaction.totals["bytes_freed"]
+    )
+    metrics.register_gauge(
+        "ppt_write_buffer_depth", "Puntuaciones en espera de escritura",
+        lambda: database.db.write_buffer.depth if database.db.write_buffer else 0
+    )
+
 # Eventos de inicio y cierre
 @app.on_event("startup")
 async def startup_event():
     """Ejecutar al iniciar la aplicación"""
-    print(f"🚀 Iniciando {settings.PROJECT_NAME}...")
-    print(f"🌍 Ambiente: {settings.ENVIRONMENT}")
+    setup_logging()
+    logger.info("🚀 Iniciando %s...", settings.PROJECT_NAME)
+    logger.info("🌍 Ambiente: %s", settings.ENVIRONMENT)
     
-    await connect_to_mongo()
+    leaderboard_events.reopen()
+    await connect_to_database()
+    await start_write_buffer()
+    start_game_stats()
     
-    if settings.CREATE_INDEXES_ON_STARTUP:
-        from app.services.database import create_indexes
-        await create_indexes()
+    # Verificar la conexión, crear índices y cargar cachés sin bloquear:
+    # la API empieza a responder de inmediato y /ready indica cuándo
+    # el almacenamiento está listo
+    start_warm_up()
     
-    print("✅ Aplicación lista")
+    logger.info("✅ Aplicación lista")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Ejecutar al cerrar la aplicación"""
-    await close_mongo_connection()
+    await stop_warm_up()
+    await stop_compaction()
+    # Cerrar los streams SSE abiertos para no retrasar el apagado
+    leaderboard_events.close()
+    await stop_change_stream()
+    await stop_write_buffer()
+    await stop_game_stats()
+    await stop_rank_index()
+    await stop_leaderboard_cache()
+    await close_database_connection()
+    # Al final, para que se escriban también los logs del cierre
+    stop_logging()
 
 # Registrar routers
 app.include_router(game.router, prefix=settings.API_V1_STR)
+app.include_router(game_ws.router, prefix=settings.API_V1_STR)
 app.include_router(leaderboard.router, prefix=settings.API_V1_STR)
 
 # Ruta raíz
@@ -97,6 +180,7 @@ async def root():
         "environment": settings.ENVIRONMENT,
         "api_prefix": settings.API_V1_STR,
         "health_check": "/health",
+        "readiness_check": "/ready",
         "documentation": "/docs" if not settings.is_production else "Deshabilitado en producción"
     }
 
@@ -109,8 +193,15 @@ async def api_root():
         "version": "1.0.0",
         "endpoints": {
             "game": "/api/game/play",
+            "game_batch": "/api/game/play/batch",
+            "game_match": "/api/game/match",
+            "game_ws": "/api/game/ws",
+            "game_stats": "/api/game/stats",
             "leaderboard_normal": "/api/leaderboard/normal",
             "leaderboard_imposible": "/api/leaderboard/imposible",
+            "leaderboard_adaptativo": "/api/leaderboard/adaptativo",
+            "leaderboard_rank": "/api/leaderboard/{mode}/rank?score=",
+            "leaderboard_stream": "/api/leaderboard/{mode}/stream",
             "save_score": "/api/leaderboard"
         }
     }
@@ -120,19 +211,46 @@ async def api_root():
 async def health_check():
     return {
         "status": "healthy",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "rate_limiter": rate_limit_stats()
     }
 
+# Readiness: base de datos conectada, índices creados y cachés cargados
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    checks = readiness()
+    ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "checks": checks}
+    )
+
+# Métricas en formato Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # Global Exception Handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Handler global para excepciones no capturadas"""
-    print(f"❌ Error no capturado: {str(exc)}")
+    # Corre fuera de RequestIdMiddleware: el id se toma de request.state
+    request_id = request.state.request_id
+    logger.error(
+        "❌ Error no capturado: %s", exc,
+        exc_info=exc, extra={"request_id": request_id}
+    )
     
     if settings.is_production:
         return JSONResponse(
             status_code=500,
-            content={"error": "Error interno del servidor"}
+            content={"error": "Error interno del servidor"},
+            headers={"X-Request-ID": request_id}
         )
     else:
         return JSONResponse(
@@ -140,5 +258,6 @@ async def global_exception_handler(request: Request, exc: Exception):
             content={
                 "error": "Error interno del servidor",
                 "detail": str(exc)
-            }
-        )
\ No newline at end of file
+            },
+            headers={"X-Request-ID": request_id}
+        )
@@ -0,0 +1,42 @@
+import time
+from app.services.metrics import metrics
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro que mide la latencia por ruta y las solicitudes
+    en curso. La ruta se toma de scope["route"], que FastAPI completa al
+    resolver el endpoint, para usar la plantilla (/leaderboard/{mode}) y no
+    la URL concreta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.request_started(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.request_finished(method)
+            route = scope.get("route")
+            metrics.observe_request(
+                getattr(route, "path", "unmatched"),
+                method,
+                status_code,
+                time.perf_counter() - start
+            )
@@ -0,0 +1,352 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+from limits.storage import Storage
+
+# Cada clave ocupa un slot de tamaño fijo:
+# hash (8) | inicio de ventana en ms (8) | actual (4) | anterior (4) | ventana en ms (4)
+SLOT = struct.Struct("<QQIII4x")
+SLOT_KEY = struct.Struct("<QQ")
+# Cabecera compartida: magic | capacidad | inicio del último barrido en ms |
+# claves activas | posición del barrido en curso (= capacidad si no hay)
+HEADER = struct.Struct("<8sQQQQ")
+HEADER_SIZE = 64
+MAGIC = b"PPTRL002"
+MAX_LOAD = 0.75
+# Slots que revisa el barrido incremental en cada incr()
+SWEEP_STEP = 64
+
+
+def _hash_key(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    # 0 marca un slot vacío
+    return int.from_bytes(digest, "little") or 1
+
+
+class SlidingWindowTable:
+    """
+    Tabla hash de direccionamiento abierto con un contador de ventana
+    deslizante por clave.
+
+    El conteo de una clave se aproxima como
+    anterior * (fracción restante de la ventana) + actual, así que el estado
+    por clave es fijo (dos contadores) sin importar cuántas solicitudes haga.
+    Vive en un bytearray (un proceso) o en un mmap (varios workers).
+
+    Las claves expiradas se borran de a SWEEP_STEP slots por incr(), sin
+    reconstruir la tabla. Con la tabla llena, una clave nueva reemplaza a
+    la de ventana más antigua de su recorrido: siempre se cuenta.
+    """
+
+    def __init__(self, buffer, capacity: int, lock, sweep_interval: float):
+        self.buffer = buffer
+        self.capacity = capacity
+        self.lock = lock
+        self.sweep_interval_ms = int(sweep_interval * 1000)
+        self.max_keys = int(capacity * MAX_LOAD)
+        self.evictions = 0
+
+        with self.lock():
+            magic, stored_capacity, _, _, _ = HEADER.unpack_from(self.buffer, 0)
+            if magic != MAGIC or stored_capacity != capacity:
+                self.buffer[:] = bytes(len(self.buffer))
+                self._set_header(self._now(), 0, capacity)
+
+    @staticmethod
+    def _now() -> int:
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def size_for(capacity: int) -> int:
+        return HEADER_SIZE + capacity * SLOT.size
+
+    def _header(self):
+        """(inicio del último barrido, claves activas, posición del barrido)"""
+        return HEADER.unpack_from(self.buffer, 0)[2:]
+
+    def _set_header(self, last_sweep: int, keys: int, cursor: int):
+        HEADER.pack_into(self.buffer, 0, MAGIC, self.capacity, last_sweep, keys, cursor)
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + index * SLOT.size
+
+    def _find(self, key_hash: int, create: bool) -> int:
+        """
+        Offset del slot de la clave, o -1 si no existe. Con create=True
+        siempre devuelve un slot vacío: con la tabla llena se libera antes
+        el de ventana más antigua (el usado hace más tiempo).
+        """
+        index = key_hash % self.capacity
+        victim, victim_start = -1, 0
+        for _ in range(self.capacity):
+            offset = self._offset(index)
+            slot_hash, window_start = SLOT_KEY.unpack_from(self.buffer, offset)
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0:
+                if not create:
+                    return -1
+                last_sweep, keys, cursor = self._header()
+                if keys < self.max_keys:
+                    self._set_header(last_sweep, keys + 1, cursor)
+                    return offset
+                if victim >= 0:
+                    break
+                # Recorrido vacío: liberar una clave de los slots siguientes;
+                # borrarla no mueve nada hacia este slot
+                victim = self._oldest(index + 1)
+                if victim < 0:
+                    self._set_header(last_sweep, keys + 1, cursor)
+                    return offset
+                self._delete(victim)
+                self.evictions += 1
+                return offset
+            if create and (victim < 0 or window_start < victim_start):
+                victim, victim_start = index, window_start
+            index = (index + 1) % self.capacity
+
+        if victim < 0:
+            return -1
+        # Reemplazar en el mismo slot mantiene válidos los recorridos de las demás
+        self.evictions += 1
+        offset = self._offset(victim)
+        SLOT.pack_into(self.buffer, offset, 0, 0, 0, 0, 0)
+        return offset
+
+    def _oldest(self, start: int) -> int:
+        """Índice del slot ocupado de ventana más antigua entre los SWEEP_STEP siguientes"""
+        oldest, oldest_start = -1, 0
+        for index in range(start, start + SWEEP_STEP):
+            index %= self.capacity
+            slot_hash, window_start = SLOT_KEY.unpack_from(self.buffer, self._offset(index))
+            if slot_hash and (oldest < 0 or window_start < oldest_start):
+                oldest, oldest_start = index, window_start
+        return oldest
+
+    @staticmethod
+    def _roll(window_start: int, current: int, previous: int, window: int, now: int):
+        """Avanzar la ventana si ya terminó"""
+        if now >= window_start + window:
+            previous = current if now < window_start + 2 * window else 0
+            current = 0
+            window_start = now - now % window
+        return window_start, current, previous
+
+    @staticmethod
+    def _weighted(window_start: int, current: int, previous: int, window: int, now: int) -> int:
+        remaining = max(0.0, 1.0 - (now - window_start) / window)
+        return int(math.floor(previous * remaining)) + current
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        key_hash = _hash_key(key)
+        window = max(1, int(expiry * 1000))
+
+        with self.lock():
+            now = self._now()
+            self._maybe_sweep(now)
+
+            offset = self._find(key_hash, create=True)
+            slot_hash, window_start, current, previous, _ = SLOT.unpack_from(self.buffer, offset)
+            if slot_hash == 0:
+                window_start, current, previous = now - now % window, 0, 0
+            window_start, current, previous = self._roll(window_start, current, previous, window, now)
+            current = min(current + amount, 0xFFFFFFFF)
+
+            SLOT.pack_into(self.buffer, offset, key_hash, window_start, current, previous, window)
+            return self._weighted(window_start, current, previous, window, now)
+
+    def _read(self, key: str):
+        offset = self._find(_hash_key(key), create=False)
+        if offset < 0:
+            return None
+        _, window_start, current, previous, window = SLOT.unpack_from(self.buffer, offset)
+        now = self._now()
+        window_start, current, previous = self._roll(window_start, current, previous, window, now)
+        return window_start, current, previous, window, now
+
+    def get(self, key: str) -> int:
+        with self.lock():
+            state = self._read(key)
+        return self._weighted(*state) if state else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self.lock():
+            state = self._read(key)
+        if state is None:
+            return time.time()
+        window_start, _, _, window, _ = state
+        return (window_start + window) / 1000
+
+    def clear(self, key: str):
+        with self.lock():
+            offset = self._find(_hash_key(key), create=False)
+            if offset >= 0:
+                slot_hash, window_start, _, _, window = SLOT.unpack_from(self.buffer, offset)
+                SLOT.pack_into(self.buffer, offset, slot_hash, window_start, 0, 0, window)
+
+    def reset(self) -> int:
+        with self.lock():
+            keys = self._header()[1]
+            self.buffer[HEADER_SIZE:] = bytes(len(self.buffer) - HEADER_SIZE)
+            self._set_header(self._now(), 0, self.capacity)
+        return keys
+
+    def _maybe_sweep(self, now: int):
+        """
+        Avanzar el barrido en curso SWEEP_STEP slots. Se empieza uno cada
+        sweep_interval o, con la tabla llena, en cuanto termina el anterior.
+        """
+        last_sweep, keys, cursor = self._header()
+        if cursor >= self.capacity:
+            if keys < self.max_keys and now - last_sweep < self.sweep_interval_ms:
+                return
+            last_sweep, cursor = now, 0
+
+        end = min(cursor + SWEEP_STEP, self.capacity)
+        while cursor < end:
+            offset = self._offset(cursor)
+            slot_hash, window_start, _, _, window = SLOT.unpack_from(self.buffer, offset)
+            if slot_hash and now >= window_start + 2 * window:
+                # Los slots que recorre el borrado también cuentan en el paso;
+                # puede haber llegado otra clave a este slot: revisarlo de nuevo
+                end -= self._delete(cursor)
+                keys -= 1
+                continue
+            cursor += 1
+        self._set_header(last_sweep, keys, cursor)
+
+    def _delete(self, index: int) -> int:
+        """
+        Borrar un slot moviendo hacia atrás las claves de su recorrido (sin
+        lápidas). Devuelve cuántos slots revisó.
+        """
+        hole = index
+        index = (index + 1) % self.capacity
+        walked = 1
+        while True:
+            walked += 1
+            offset = self._offset(index)
+            slot = SLOT.unpack_from(self.buffer, offset)
+            if slot[0] == 0:
+                break
+            home = slot[0] % self.capacity
+            # La clave puede ocupar el hueco si su posición inicial no está
+            # entre el hueco (exclusive) y su slot actual (inclusive)
+            if (index - home) % self.capacity >= (index - hole) % self.capacity:
+                SLOT.pack_into(self.buffer, self._offset(hole), *slot)
+                hole = index
+            index = (index + 1) % self.capacity
+        SLOT.pack_into(self.buffer, self._offset(hole), 0, 0, 0, 0, 0)
+        return walked
+
+    def stats(self) -> dict:
+        with self.lock():
+            keys = self._header()[1]
+        return {
+            "keys": keys,
+            "capacity": self.capacity,
+            "memory_bytes": len(self.buffer),
+            "evictions": self.evictions,
+        }
+
+
+class SlidingWindowStorage(Storage):
+    """
+    Storage de `limits` (usado por slowapi) sobre SlidingWindowTable.
+
+    - ppt-memory://            tabla en memoria del proceso
+    - ppt-mmap:///ruta/archivo tabla en memoria compartida entre workers
+
+    Con la estrategia fixed-window de slowapi el valor que devuelve incr()
+    ya es el conteo ponderado, de modo que los límites por ruta existentes
+    se aplican como ventana deslizante.
+    """
+
+    STORAGE_SCHEME = ["ppt-memory", "ppt-mmap"]
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        wrap_exceptions: bool = False,
+        capacity: int = 65536,
+        sweep_interval: float = 60,
+        **options,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri or "ppt-memory://")
+        capacity = int(capacity)
+        size = SlidingWindowTable.size_for(capacity)
+
+        if parsed.scheme == "ppt-mmap":
+            self.backend = "mmap"
+            buffer, lock = self._open_shared(parsed.path, size)
+        else:
+            self.backend = "memory"
+            buffer = bytearray(size)
+            thread_lock = threading.Lock()
+
+            @contextmanager
+            def lock():
+                with thread_lock:
+                    yield
+
+        self.table = SlidingWindowTable(buffer, capacity, lock, float(sweep_interval))
+
+    @staticmethod
+    def _open_shared(path: str, size: int):
+        import fcntl
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        buffer = mmap.mmap(fd, size)
+        thread_lock = threading.Lock()
+
+        @contextmanager
+        def lock():
+            # flock excluye a otros procesos; el lock local, a otros hilos
+            with thread_lock:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+        return buffer, lock
+
+    @property
+    def base_exceptions(self):
+        return OSError
+
+    def incr(self, key: str, expiry: int, amount: int = 1, **_) -> int:
+        return self.table.incr(key, expiry, amount)
+
+    def get(self, key: str) -> int:
+        return self.table.get(key)
+
+    def get_expiry(self, key: str) -> float:
+        return self.table.get_expiry(key)
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int:
+        return self.table.reset()
+
+    def clear(self, key: str) -> None:
+        self.table.clear(key)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self.table.stats()}
@@ -3,22 +3,82 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+from limits import parse
+from app.config import settings
+from app.services.metrics import metrics
+# Registrar los esquemas ppt-memory:// y ppt-mmap:// en limits
+from app.middleware import rate_limit_storage  # noqa: F401
+
+# Scopes de límites compartidos entre las rutas HTTP y los mensajes del
+# WebSocket: abrir más conexiones no multiplica el límite de una IP
+PLAY_SCOPE = "game_play"
+MATCH_SCOPE = "game_match"
+SAVE_SCOPE = "leaderboard_save"
+
+def _storage_uri() -> str:
+    """URI del storage de límites según RATE_LIMIT_STORAGE"""
+    if settings.RATE_LIMIT_STORAGE == "mmap":
+        return f"ppt-mmap://{settings.RATE_LIMIT_MMAP_PATH}"
+    if settings.RATE_LIMIT_STORAGE == "memory":
+        return "ppt-memory://"
+    return "memory://"  # Storage por defecto de slowapi
 
 # Configurar rate limiter usando IP del cliente
 # No cargar automáticamente desde .env para evitar problemas de codificación
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["100/minute"],
+    enabled=settings.RATE_LIMIT_ENABLED,
+    storage_uri=_storage_uri(),
+    storage_options=(
+        {
+            "capacity": settings.RATE_LIMIT_MAX_KEYS,
+            "sweep_interval": settings.RATE_LIMIT_SWEEP_SECONDS,
+        }
+        if settings.RATE_LIMIT_STORAGE in ("memory", "mmap")
+        else {}
+    ),
     config_filename=None  # Agregar esta línea
 )
 
-async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
-    """Handler personalizado para errores de rate limit"""
+def rate_limit_stats() -> dict:
+    """Claves activas y memoria usada por el storage de límites"""
+    storage = limiter._storage
+    if hasattr(storage, "stats"):
+        return storage.stats()
+    return {"backend": "slowapi"}
+
+def rate_limit_response(retry_after: str) -> Response:
+    """Respuesta 429 común a todos los límites"""
     return JSONResponse(
         status_code=429,
         content={
             "error": "Demasiadas solicitudes",
             "message": "Has excedido el límite de solicitudes. Por favor, espera un momento.",
-            "retry_after": exc.detail
+            "retry_after": retry_after
         }
-    )
\ No newline at end of file
+    )
+
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
+    """Handler personalizado para errores de rate limit"""
+    route = request.scope.get("route")
+    metrics.rate_limit_rejected(getattr(route, "path", request.url.path))
+    return rate_limit_response(exc.detail)
+
+def hit_rate_limit(request: Request, limit_value: str, scope: str, cost: int = 1) -> bool:
+    """
+    Consumir `cost` unidades de un límite para la IP del cliente
+    Returns: False si la solicitud excede el límite
+    """
+    if not limiter.enabled:
+        return True
+    
+    allowed = limiter.limiter.hit(
+        parse(limit_value),
+        get_remote_address(request),
+        scope,
+        cost=cost
+    )
+    if not allowed:
+        metrics.rate_limit_rejected(scope)
+    return allowed
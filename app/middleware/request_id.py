@@ -0,0 +1,47 @@
+import re
+import secrets
+from app.services.log import request_id_var
+
+# Ids aceptados desde el cliente o el proxy; cualquier otro se reemplaza
+_VALID_REQUEST_ID = re.compile(rb"^[A-Za-z0-9._-]{1,64}$")
+_HEADER = b"x-request-id"
+
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI puro que asigna un id a cada solicitud o conexión
+    WebSocket: reutiliza X-Request-ID si viene (p. ej. del proxy) o genera
+    uno. Queda en request_id_var para los logs, en request.state.request_id
+    y en la cabecera X-Request-ID de la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == _HEADER:
+                if _VALID_REQUEST_ID.match(value):
+                    request_id = value
+                break
+        if request_id is None:
+            request_id = secrets.token_hex(8).encode()
+
+        # Los handlers de excepciones corren fuera de este middleware: lo leen de state
+        scope.setdefault("state", {})["request_id"] = request_id.decode()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (_HEADER, request_id)]
+            await send(message)
+
+        token = request_id_var.set(scope["state"]["request_id"])
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,52 @@
+from typing import Iterable, List, Tuple
+
+
+def security_headers(production: bool) -> List[Tuple[str, str]]:
+    """Cabeceras de seguridad de cada respuesta según el ambiente"""
+    headers = [
+        ("X-Frame-Options", "DENY"),
+        ("X-Content-Type-Options", "nosniff"),
+        ("X-XSS-Protection", "1; mode=block"),
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ]
+
+    if production:
+        # CSP más permisivo en producción para evitar problemas
+        headers.append(("Content-Security-Policy", "default-src 'self' 'unsafe-inline' 'unsafe-eval' *"))
+        headers.append(("Strict-Transport-Security", "max-age=31536000; includeSubDomains"))
+
+    return headers
+
+
+class SecurityHeadersMiddleware:
+    """
+    Middleware ASGI puro que agrega las cabeceras de seguridad.
+
+    La lista se codifica una sola vez al crear la app y solo se toca el
+    mensaje http.response.start, así que las respuestas en streaming (SSE)
+    pasan sin acumularse y los WebSockets no se modifican.
+    """
+
+    def __init__(self, app, headers: Iterable[Tuple[str, str]]):
+        self.app = app
+        self.headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+        self.names = frozenset(name for name, _ in self.headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Reemplazan a las que haya puesto la ruta, como antes
+                message["headers"] = [
+                    header for header in message.get("headers", ())
+                    if header[0] not in self.names
+                ] + self.headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,22 +1,62 @@
-from fastapi import APIRouter, HTTPException, Request
-from app.schemas.game_schemas import PlayRequest, PlayResponse
-from app.services.game_logic import GameLogic
-from app.middleware.rate_limiter import limiter
+import email.message
+import json
+import logging
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from app.schemas.game_schemas import (
+    PlayRequest,
+    PlayResponse,
+    PlayBatchRequest,
+    PlayBatchResponse,
+    MatchRequest,
+    MatchResponse,
+    GameStatsResponse,
+)
+from slowapi.util import get_remote_address
+from app.services.game_logic import GameLogic, ADAPTIVE_MODE
+from app.services.session_store import match_store, predictor_store, MatchError
+from app.services.database import game_stats
+from app.middleware.rate_limiter import (
+    limiter,
+    hit_rate_limit,
+    rate_limit_response,
+    PLAY_SCOPE,
+    MATCH_SCOPE,
+)
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/game",
     tags=["game"]
 )
 
-@router.post("/play", response_model=PlayResponse)
-@limiter.limit(f"{settings.MAX_GAME_PLAYS_PER_MINUTE}/minute")
-async def play_round(request: Request, play_request: PlayRequest):
+@router.post("/match", response_model=MatchResponse, status_code=201)
+@limiter.shared_limit(f"{settings.MAX_REQUESTS_PER_MINUTE}/minute", scope=MATCH_SCOPE)
+async def create_match(request: Request, match_request: MatchRequest):
     """
-    Realizar una jugada contra la computadora
+    Iniciar una partida al mejor de N rondas llevada por el servidor
     
-    Rate limit: 30 jugadas por minuto por IP
+    Rate limit: 60 partidas por minuto por IP
     """
+    match_id, match = match_store.create(match_request.mode, match_request.rounds)
+    
+    return MatchResponse(
+        match_id=match_id,
+        mode=match.mode,
+        rounds=match.rounds
+    )
+
+def _predictor(request: Request, mode: str):
+    """Historial del jugador (por IP) si el modo es adaptativo"""
+    if mode != ADAPTIVE_MODE:
+        return None
+    return predictor_store.for_player(get_remote_address(request))
+
+def _play(request: Request, play_request: PlayRequest) -> PlayResponse:
+    """Jugar una ronda ya validada (con o sin partida del servidor)"""
     try:
         # Validación adicional de seguridad
         if play_request.player_move not in settings.ALLOWED_MOVES:
@@ -31,26 +71,229 @@ async def play_round(request: Request, play_request: PlayRequest):
                 detail="Modo de juego inválido"
             )
         
-        # Obtener jugada de la CPU según el modo
-        if play_request.mode == "normal":
-            cpu_move = GameLogic.get_cpu_move_normal()
-        else:  # imposible
-            cpu_move = GameLogic.get_cpu_move_imposible(play_request.player_move)
+        match = None
+        if play_request.match_id is not None:
+            try:
+                match = match_store.get_playable(play_request.match_id, play_request.mode)
+            except MatchError as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+        # Obtener jugada de la CPU según el modo y evaluar resultado
+        if match is not None:
+            predictor = match.predictor
+        else:
+            predictor = _predictor(request, play_request.mode)
+        cpu_move, result = GameLogic.play(play_request.mode, play_request.player_move, predictor)
+        game_stats.record(play_request.mode, play_request.player_move, cpu_move, result)
         
-        # Evaluar resultado
-        result = GameLogic.evaluate_round(play_request.player_move, cpu_move)
+        if match is not None:
+            match.record(result)
         
         return PlayResponse(
             cpu_move=cpu_move,
-            result=result
+            result=result,
+            match=match.to_dict() if match is not None else None
         )
     
     except HTTPException:
         raise
     except Exception as e:
-        # Log del error (en producción usar logging apropiado)
-        print(f"Error en play_round: {str(e)}")
+        logger.exception("Error en play_round: %s", e)
+        raise HTTPException(
+            status_code=500, 
+            detail="Error interno del servidor"
+        )
+
+async def play_round(request: Request, play_request: PlayRequest):
+    """
+    Realizar una jugada contra la computadora
+    
+    Rate limit: 30 jugadas por minuto por IP
+    """
+    return _play(request, play_request)
+
+# ===================================
+# Camino rápido de /play
+# ===================================
+
+# Las 9 respuestas posibles (player_move, cpu_move) precodificadas, con el
+# mismo JSON compacto que produciría JSONResponse
+_PLAY_BODIES = {
+    (player_move, cpu_move): json.dumps(
+        {"cpu_move": cpu_move, "result": GameLogic.evaluate_round(player_move, cpu_move)},
+        separators=(",", ":")
+    ).encode()
+    for player_move in settings.ALLOWED_MOVES
+    for cpu_move in settings.ALLOWED_MOVES
+}
+_ALLOWED_MOVES = frozenset(settings.ALLOWED_MOVES)
+_ALLOWED_MODES = frozenset(settings.ALLOWED_GAME_MODES)
+
+async def _read_body(request: Request):
+    """
+    Cuerpo de la solicitud como lo entrega FastAPI a la validación: JSON
+    solo sin Content-Type o con subtipo json / +json, si no los bytes tal cual
+    """
+    try:
+        body = await request.body()
+        if not body:
+            return None
+        content_type = request.headers.get("content-type")
+        if content_type:
+            message = email.message.Message()
+            message["content-type"] = content_type
+            subtype = message.get_content_subtype()
+            if message.get_content_maintype() != "application" or not (
+                subtype == "json" or subtype.endswith("+json")
+            ):
+                return body
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [{
+                "type": "json_invalid",
+                "loc": ("body", e.pos),
+                "msg": "JSON decode error",
+                "input": {},
+                "ctx": {"error": e.msg},
+            }],
+            body=e.doc
+        )
+    except Exception:
+        # p. ej. UnicodeDecodeError con un cuerpo que no es UTF-8
+        raise HTTPException(status_code=400, detail="There was an error parsing the body")
+
+async def play_round_fast(request: Request):
+    """
+    Realizar una jugada contra la computadora
+    
+    Valida una sola vez y responde con uno de los cuerpos precodificados.
+    Cualquier solicitud fuera del caso común (partida, tipos que requieren
+    conversión, errores) pasa por PlayRequest para conservar exactamente
+    las mismas reglas y mensajes de validación.
+    
+    Rate limit: 30 jugadas por minuto por IP
+    """
+    data = await _read_body(request)
+    if data is None:
+        # Igual que FastAPI: sin cuerpo (o `null`) falta el cuerpo requerido
+        raise RequestValidationError(
+            [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        )
+    
+    if (
+        type(data) is dict
+        and type(data.get("player_move")) is int
+        and data["player_move"] in _ALLOWED_MOVES
+        and type(data.get("mode")) is str
+        and data["mode"] in _ALLOWED_MODES
+        and data.get("match_id") is None
+    ):
+        cpu_move, result = GameLogic.play(
+            data["mode"], data["player_move"], _predictor(request, data["mode"])
+        )
+        game_stats.record(data["mode"], data["player_move"], cpu_move, result)
+        return Response(
+            content=_PLAY_BODIES[(data["player_move"], cpu_move)],
+            media_type="application/json"
+        )
+    
+    try:
+        # FastAPI valida el cuerpo con from_attributes=True: de ahí el error
+        # model_attributes_type (y no model_type) para cuerpos que no son objetos
+        play_request = PlayRequest.model_validate(data, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+            body=data
+        )
+    
+    return Response(
+        content=_play(request, play_request).model_dump_json(exclude_none=True),
+        media_type="application/json"
+    )
+
+_PLAY_ROUTE = dict(
+    response_model=PlayResponse,
+    response_model_exclude_none=True,
+    name="play_round",
+)
+
+if settings.PLAY_FAST_PATH_ENABLED:
+    router.post(
+        "/play",
+        **_PLAY_ROUTE,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {"application/json": {"schema": PlayRequest.model_json_schema()}}
+            }
+        }
+    )(limiter.shared_limit(f"{settings.MAX_GAME_PLAYS_PER_MINUTE}/minute", scope=PLAY_SCOPE)(play_round_fast))
+else:
+    router.post("/play", **_PLAY_ROUTE)(
+        limiter.shared_limit(f"{settings.MAX_GAME_PLAYS_PER_MINUTE}/minute", scope=PLAY_SCOPE)(play_round)
+    )
+
+@router.post("/play/batch", response_model=PlayBatchResponse)
+async def play_batch(request: Request, batch_request: PlayBatchRequest):
+    """
+    Realizar varias jugadas en una sola solicitud (bots y repeticiones)
+    
+    Rate limit: cada ronda del lote cuenta contra MAX_BATCH_ROUNDS_PER_MINUTE
+    """
+    rounds = len(batch_request.player_moves)
+    if not hit_rate_limit(
+        request,
+        f"{settings.MAX_BATCH_ROUNDS_PER_MINUTE}/minute",
+        scope="game_play_batch",
+        cost=rounds
+    ):
+        return rate_limit_response(f"{settings.MAX_BATCH_ROUNDS_PER_MINUTE} per 1 minute")
+    
+    try:
+        player_moves = GameLogic.as_moves(batch_request.player_moves)
+        
+        if batch_request.mode == "normal":
+            cpu_moves = GameLogic.get_cpu_moves_normal(rounds)
+        elif batch_request.mode == ADAPTIVE_MODE:
+            cpu_moves = GameLogic.get_cpu_moves_adaptativo(
+                player_moves, _predictor(request, batch_request.mode)
+            )
+        else:  # imposible
+            cpu_moves = GameLogic.get_cpu_moves_imposible(player_moves)
+        
+        results = GameLogic.evaluate_rounds(player_moves, cpu_moves)
+        game_stats.record_batch(batch_request.mode, player_moves, cpu_moves, results)
+        
+        return PlayBatchResponse(
+            cpu_moves=cpu_moves.tolist(),
+            results=GameLogic.result_labels(results)
+        )
+    
+    except Exception as e:
+        logger.exception("Error en play_batch: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="Error interno del servidor"
-        )
\ No newline at end of file
+        )
+
+@router.get("/stats", response_model=GameStatsResponse)
+@limiter.limit(f"{settings.MAX_REQUESTS_PER_MINUTE}/minute")
+async def get_game_stats(request: Request):
+    """
+    Estadísticas globales de juego por modo: resultados y jugadas
+    
+    Se leen de memoria: los totales de todas las instancias se actualizan
+    cada GAME_STATS_FLUSH_SECONDS, más lo jugado en esta instancia desde
+    el último envío.
+    
+    Rate limit: 60 solicitudes por minuto por IP
+    """
+    if not settings.GAME_STATS_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail="Estadísticas de juego deshabilitadas"
+        )
+    
+    return {"modes": game_stats.snapshot(settings.ALLOWED_GAME_MODES)}
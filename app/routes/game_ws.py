@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from app.schemas.game_schemas import PlayRequest, MatchRequest
+from app.schemas.leaderboard_schemas import LeaderboardEntry
+from app.services.game_logic import GameLogic, AdaptivePredictor
+from app.services.session_store import match_store, MatchError
+from app.services.database import save_score_entry, rank_index, game_stats
+from app.services.write_buffer import WriteBufferFull
+from app.middleware.rate_limiter import hit_rate_limit, PLAY_SCOPE, MATCH_SCOPE, SAVE_SCOPE
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/game",
+    tags=["game"]
+)
+
+RATE_LIMIT_ERROR = {
+    "type": "error",
+    "error": "Demasiadas solicitudes",
+    "message": "Has excedido el límite de solicitudes. Por favor, espera un momento.",
+}
+
+
+# Tipo de mensaje -> (límite, scope) de la ruta HTTP equivalente
+_MESSAGE_LIMITS = {
+    "play": (f"{settings.MAX_GAME_PLAYS_PER_MINUTE}/minute", PLAY_SCOPE),
+    "match": (f"{settings.MAX_REQUESTS_PER_MINUTE}/minute", MATCH_SCOPE),
+    "save": (f"{settings.MAX_LEADERBOARD_SAVES_PER_MINUTE}/minute", SAVE_SCOPE),
+}
+
+
+def _error(detail) -> dict:
+    return {"type": "error", "detail": detail}
+
+
+def _handle_match(data: dict) -> dict:
+    match_request = MatchRequest.model_validate(data)
+    match_id, match = match_store.create(match_request.mode, match_request.rounds)
+    return {
+        "type": "match",
+        "match_id": match_id,
+        "mode": match.mode,
+        "rounds": match.rounds,
+    }
+
+
+def _handle_play(data: dict, predictor: AdaptivePredictor) -> dict:
+    play_request = PlayRequest.model_validate(data)
+
+    match = None
+    if play_request.match_id is not None:
+        match = match_store.get_playable(play_request.match_id, play_request.mode)
+
+    if match is not None:
+        predictor = match.predictor
+    cpu_move, result = GameLogic.play(play_request.mode, play_request.player_move, predictor)
+    game_stats.record(play_request.mode, play_request.player_move, cpu_move, result)
+
+    response = {"type": "result", "cpu_move": cpu_move, "result": result}
+    if match is not None:
+        match.record(result)
+        response["match"] = match.to_dict()
+    return response
+
+
+async def _handle_save(data: dict) -> dict:
+    entry = LeaderboardEntry.model_validate(data)
+    result, score = await save_score_entry(
+        player_name=entry.player_name,
+        score=entry.score,
+        mode=entry.mode,
+        match_id=entry.match_id
+    )
+
+    position = rank_index.rank(entry.mode, score)
+
+    return {
+        "type": "saved",
+        "id": str(result),
+        "player_name": entry.player_name,
+        "score": score,
+        "rank": position["rank"] if position else None,
+    }
+
+
+@router.websocket("/ws")
+async def game_websocket(websocket: WebSocket):
+    """
+    Jugar rondas sobre una sola conexión WebSocket
+
+    Mensajes (JSON):
+    - {"type": "match", "mode", "rounds"} -> {"type": "match", "match_id", ...}
+    - {"type": "play", "player_move", "mode", "match_id"?} -> {"type": "result", ...}
+    - {"type": "save", "player_name", "mode", "score" | "match_id"} -> {"type": "saved", ...}
+
+    Rate limit por IP, compartido con las rutas HTTP: cada mensaje cuenta
+    igual que POST /game/play, /game/match o /leaderboard
+    """
+    # Abrir conexiones también cuenta contra el límite por IP
+    if not hit_rate_limit(
+        websocket,
+        f"{settings.MAX_REQUESTS_PER_MINUTE}/minute",
+        scope="game_ws_connect"
+    ):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    # Historial del modo adaptativo fuera de una partida: dura lo que la conexión
+    predictor = AdaptivePredictor(settings.ADAPTIVE_ORDER)
+
+    try:
+        while True:
+            try:
+                text = await asyncio.wait_for(
+                    websocket.receive_text(),
+                    timeout=settings.WS_IDLE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+
+            # En bytes: un carácter puede ocupar hasta 4 en UTF-8
+            if len(text.encode()) > settings.WS_MAX_MESSAGE_BYTES:
+                await websocket.send_json(_error("Mensaje demasiado grande"))
+                continue
+
+            try:
+                data = json.loads(text)
+                if not isinstance(data, dict):
+                    raise ValueError
+            except ValueError:
+                await websocket.send_json(_error("JSON inválido"))
+                continue
+
+            message_type = data.pop("type", None)
+
+            limit = _MESSAGE_LIMITS.get(message_type) if isinstance(message_type, str) else None
+            if limit is not None and not hit_rate_limit(websocket, *limit):
+                await websocket.send_json(RATE_LIMIT_ERROR)
+                continue
+
+            try:
+                if message_type == "play":
+                    response = _handle_play(data, predictor)
+
+                elif message_type == "match":
+                    response = _handle_match(data)
+
+                elif message_type == "save":
+                    response = await _handle_save(data)
+
+                else:
+                    response = _error("Tipo de mensaje inválido")
+
+            except ValidationError as e:
+                response = _error(e.errors(include_url=False, include_context=False))
+            except MatchError as e:
+                response = _error(e.detail)
+            except ValueError as e:
+                response = _error(str(e))
+            except WriteBufferFull:
+                response = _error("Servidor ocupado. Intenta de nuevo en unos segundos")
+            except Exception as e:
+                logger.exception("Error en game_websocket: %s", e)
+                response = _error("Error interno del servidor")
+
+            await websocket.send_json(response)
+
+    except WebSocketDisconnect:
+        pass
@@ -1,20 +1,60 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import List
-from app.schemas.leaderboard_schemas import LeaderboardEntry, LeaderboardResponse
-from app.services.database import save_leaderboard_entry, get_leaderboard
-from app.middleware.rate_limiter import limiter
+import asyncio
+import logging
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.schemas.leaderboard_schemas import LeaderboardEntry, LeaderboardResponse, RankResponse
+from app.services.database import (
+    save_score_entry,
+    get_leaderboard_json,
+    get_leaderboard_page_json,
+    get_rank,
+    rank_index,
+    leaderboard_events,
+)
+from app.services.write_buffer import WriteBufferFull
+from app.services.session_store import idempotency_store, MatchError, IdempotencyKeyReused
+from app.middleware.rate_limiter import limiter, SAVE_SCOPE
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/leaderboard",
     tags=["leaderboard"]
 )
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (admite listas y *)"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
 @router.get("/{mode}", response_model=List[LeaderboardResponse])
 @limiter.limit(f"{settings.MAX_REQUESTS_PER_MINUTE}/minute")
-async def get_leaderboard_by_mode(request: Request, mode: str):
+async def get_leaderboard_by_mode(
+    request: Request,
+    mode: str,
+    unique: bool = Query(False, description="Una sola entrada (la mejor) por jugador"),
+    window: Optional[str] = Query(None, pattern="^(day|week)$", description="Solo el día o la semana actuales (UTC)"),
+    limit: int = Query(10, ge=1, le=100, description="Entradas por página"),
+    after: Optional[str] = Query(None, max_length=128, description="Cursor de X-Next-Cursor para la página siguiente")
+):
     """
-    Obtener el top 10 del leaderboard según el modo
+    Obtener el top del leaderboard según el modo (10 entradas por defecto)
+    
+    Con unique=true cada jugador aparece una sola vez, con su mejor puntuación.
+    Con window=day|week solo cuentan las puntuaciones del día o la semana
+    actuales (UTC); no se puede combinar con unique.
+    
+    El leaderboard histórico se recorre por páginas: X-Next-Cursor trae el
+    cursor para pedir la siguiente con ?after= (no se combina con unique
+    ni window). Cada página cuesta lo mismo sin importar la profundidad.
+    
+    Responde con ETag; si If-None-Match coincide devuelve 304 sin cuerpo.
     
     Rate limit: 60 solicitudes por minuto por IP
     """
@@ -27,43 +67,242 @@ async def get_leaderboard_by_mode(request: Request, mode: str):
             detail=f"Modo inválido. Debe ser uno de: {', '.join(settings.ALLOWED_GAME_MODES)}"
         )
     
+    if unique and window is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="unique y window no se pueden combinar"
+        )
+    
+    if after is not None and (unique or window is not None):
+        raise HTTPException(
+            status_code=400,
+            detail="after solo se puede usar con el leaderboard histórico"
+        )
+    
+    next_cursor = None
     try:
-        entries = await get_leaderboard(mode, limit=10)
-        return entries
+        if unique or window is not None:
+            body, etag = await get_leaderboard_json(mode, limit=limit, unique=unique, window=window)
+        else:
+            body, etag, next_cursor = await get_leaderboard_page_json(mode, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Error obteniendo leaderboard: {str(e)}")
+        logger.exception("Error obteniendo leaderboard: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="Error interno del servidor"
         )
+    
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.LEADERBOARD_HTTP_MAX_AGE_SECONDS}",
+    }
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@router.post("/", status_code=201)
-@limiter.limit(f"{settings.MAX_LEADERBOARD_SAVES_PER_MINUTE}/minute")
-async def save_score(request: Request, entry: LeaderboardEntry):
+async def _leaderboard_stream(mode: str, unique: bool, window: Optional[str]):
+    """Generador SSE: un evento con el top cada vez que cambia, y heartbeats"""
+    leaderboard_events.subscribe()
+    last_etag = None
+    # Cerrar cada cierto tiempo: EventSource reconecta solo, las conexiones
+    # se reparten entre instancias y un apagado no espera indefinidamente
+    deadline = asyncio.get_running_loop().time() + settings.SSE_MAX_DURATION_SECONDS
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        
+        while not leaderboard_events.closed:
+            changed = leaderboard_events.current(mode)
+            body, etag = await get_leaderboard_json(mode, limit=10, unique=unique, window=window)
+            
+            # Solo se envía si el contenido cambió (p. ej. una puntuación
+            # que no entra al top no genera evento)
+            if etag != last_etag:
+                event_id = etag.strip('"')
+                yield f"id: {event_id}\nevent: leaderboard\ndata: {body.decode()}\n\n"
+                last_etag = etag
+            
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            
+            if not await leaderboard_events.wait(changed, min(settings.SSE_HEARTBEAT_SECONDS, remaining)):
+                yield ": ping\n\n"
+                continue
+            
+            # Agrupar ráfagas: los cambios que lleguen en este intervalo
+            # salen en un solo evento
+            await asyncio.sleep(settings.SSE_MIN_INTERVAL_MS / 1000)
+    finally:
+        leaderboard_events.unsubscribe()
+
+@router.get("/{mode}/stream")
+@limiter.limit(f"{settings.MAX_REQUESTS_PER_MINUTE}/minute")
+async def stream_leaderboard(
+    request: Request,
+    mode: str,
+    unique: bool = Query(False, description="Una sola entrada (la mejor) por jugador"),
+    window: Optional[str] = Query(None, pattern="^(day|week)$", description="Solo el día o la semana actuales (UTC)")
+):
     """
-    Guardar puntuación en el leaderboard
+    Recibir el top 10 cada vez que cambia (Server-Sent Events)
     
-    Rate limit: 10 guardados por minuto por IP
+    Envía el estado actual al conectar y luego un evento "leaderboard" por
+    cambio; los cambios seguidos se agrupan y un cliente lento solo recibe
+    el estado más reciente. Reemplaza el polling de GET /{mode}.
+    
+    Rate limit: 60 conexiones por minuto por IP
+    """
+    mode = mode.lower().strip()
+    
+    if mode not in settings.ALLOWED_GAME_MODES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Modo inválido. Debe ser uno de: {', '.join(settings.ALLOWED_GAME_MODES)}"
+        )
+    
+    if unique and window is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="unique y window no se pueden combinar"
+        )
+    
+    if leaderboard_events.subscribers >= settings.SSE_MAX_SUBSCRIBERS:
+        raise HTTPException(
+            status_code=503,
+            detail="Demasiadas conexiones abiertas. Intenta de nuevo más tarde"
+        )
+    
+    return StreamingResponse(
+        _leaderboard_stream(mode, unique, window),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Evitar que un proxy acumule los eventos
+        }
+    )
+
+@router.get("/{mode}/rank", response_model=RankResponse)
+@limiter.limit(f"{settings.MAX_REQUESTS_PER_MINUTE}/minute")
+async def get_rank_by_mode(
+    request: Request,
+    mode: str,
+    score: int = Query(..., ge=-500, le=500, description="Puntuación a consultar")
+):
+    """
+    Obtener la posición y el percentil de una puntuación
+    
+    Rate limit: 60 solicitudes por minuto por IP
     """
+    mode = mode.lower().strip()
+    
+    if mode not in settings.ALLOWED_GAME_MODES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Modo inválido. Debe ser uno de: {', '.join(settings.ALLOWED_GAME_MODES)}"
+        )
+    
+    try:
+        position = await get_rank(mode, score)
+        return RankResponse(mode=mode, score=score, **position)
+    except Exception as e:
+        logger.exception("Error obteniendo posición: %s", e)
+        raise HTTPException(
+            status_code=500, 
+            detail="Error interno del servidor"
+        )
+
+async def _save_score(entry: LeaderboardEntry, idempotency_key: Optional[str]) -> dict:
+    """Guardar una puntuación ya validada y armar la respuesta"""
     try:
         # La validación y sanitización ya se hace en el schema LeaderboardEntry
-        result = await save_leaderboard_entry(
+        result, score = await save_score_entry(
             player_name=entry.player_name,
             score=entry.score,
-            mode=entry.mode
+            mode=entry.mode,
+            match_id=entry.match_id,
+            idempotency_key=idempotency_key
         )
         
+        # Solo si el histograma ya está en memoria (sin consultas extra)
+        position = rank_index.rank(entry.mode, score)
+        
         return {
             "message": "Puntuación guardada exitosamente",
             "id": str(result),
             "player_name": entry.player_name,
-            "score": entry.score
+            "score": score,
+            "rank": position["rank"] if position else None
         }
+    except MatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except WriteBufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado. Intenta de nuevo en unos segundos"
+        )
     except Exception as e:
-        print(f"Error guardando puntuación: {str(e)}")
+        logger.exception("Error guardando puntuación: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="Error interno del servidor"
-        )
\ No newline at end of file
+        )
+
+@router.post("/", status_code=201)
+@limiter.shared_limit(f"{settings.MAX_LEADERBOARD_SAVES_PER_MINUTE}/minute", scope=SAVE_SCOPE)
+async def save_score(
+    request: Request,
+    response: Response,
+    entry: LeaderboardEntry,
+    idempotency_key: Optional[str] = Header(
+        None,
+        min_length=1,
+        max_length=settings.IDEMPOTENCY_KEY_MAX_LENGTH,
+        pattern="^[\\x21-\\x7e]+$",
+        description="Clave única por puntuación; los reintentos con la misma clave devuelven el resultado original"
+    )
+):
+    """
+    Guardar puntuación en el leaderboard
+    
+    Si se envía match_id, la puntuación la calcula el servidor a partir de
+    la partida y se ignora la enviada por el cliente.
+    
+    Con Idempotency-Key, un reintento con la misma clave y el mismo
+    contenido devuelve el resultado original sin volver a guardar
+    (Idempotent-Replayed: true); con otro contenido responde 422.
+    
+    Rate limit: 10 guardados por minuto por IP
+    """
+    if idempotency_key is None:
+        return await _save_score(entry, None)
+    
+    fingerprint = (entry.player_name, entry.score, entry.mode, entry.match_id)
+    try:
+        replay = await idempotency_store.begin(idempotency_key, fingerprint)
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key ya usada con otra solicitud"
+        )
+    
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
+    
+    try:
+        result = await _save_score(entry, idempotency_key)
+    except BaseException:
+        idempotency_store.abort(idempotency_key)
+        raise
+    
+    idempotency_store.complete(idempotency_key, fingerprint, result)
+    return result
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
 from app.config import settings
 
 class PlayRequest(BaseModel):
@@ -10,8 +11,13 @@ class PlayRequest(BaseModel):
     )
     mode: str = Field(
         ..., 
-        pattern="^(normal|imposible)$",
-        description="Modo de juego: normal o imposible"
+        pattern="^(normal|imposible|adaptativo)$",
+        description="Modo de juego: normal, imposible o adaptativo"
+    )
+    match_id: Optional[str] = Field(
+        None,
+        max_length=32,
+        description="Partida del servidor (opcional, ver /game/match)"
     )
     
     @field_validator('player_move')
@@ -37,9 +43,19 @@ class PlayRequest(BaseModel):
             }
         }
 
+class MatchState(BaseModel):
+    player_wins: int = Field(..., description="Rondas ganadas por el jugador")
+    cpu_wins: int = Field(..., description="Rondas ganadas por la CPU")
+    ties: int = Field(..., description="Empates")
+    rounds_played: int = Field(..., description="Rondas jugadas")
+    rounds: int = Field(..., description="Rondas de la partida")
+    finished: bool = Field(..., description="Si la partida terminó")
+    score: int = Field(..., description="Puntuación calculada por el servidor")
+
 class PlayResponse(BaseModel):
     cpu_move: int = Field(..., ge=1, le=3, description="Movimiento de la CPU")
     result: str = Field(..., pattern="^(player|cpu|tie)$", description="Resultado de la ronda")
+    match: Optional[MatchState] = Field(None, description="Estado de la partida, si se jugó en una")
     
     class Config:
         json_schema_extra = {
@@ -47,4 +63,119 @@ class PlayResponse(BaseModel):
                 "cpu_move": 2,
                 "result": "cpu"
             }
-        }
\ No newline at end of file
+        }
+
+class PlayBatchRequest(BaseModel):
+    player_moves: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.MAX_BATCH_PLAY_SIZE,
+        description="Lista de jugadas: 1=Piedra, 2=Papel, 3=Tijera"
+    )
+    mode: str = Field(
+        ..., 
+        pattern="^(normal|imposible|adaptativo)$",
+        description="Modo de juego: normal, imposible o adaptativo"
+    )
+    
+    @field_validator('player_moves')
+    @classmethod
+    def validate_moves(cls, v):
+        allowed = set(settings.ALLOWED_MOVES)
+        if not allowed.issuperset(v):
+            raise ValueError(f'Movimiento inválido. Debe ser uno de: {settings.ALLOWED_MOVES}')
+        return v
+    
+    @field_validator('mode')
+    @classmethod
+    def validate_mode(cls, v):
+        v = v.lower().strip()
+        if v not in settings.ALLOWED_GAME_MODES:
+            raise ValueError(f'Modo inválido. Debe ser uno de: {settings.ALLOWED_GAME_MODES}')
+        return v
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "player_moves": [1, 3, 2],
+                "mode": "normal"
+            }
+        }
+
+class PlayBatchResponse(BaseModel):
+    cpu_moves: List[int] = Field(..., description="Movimientos de la CPU")
+    results: List[str] = Field(..., description="Resultado de cada ronda: player, cpu o tie")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "cpu_moves": [2, 3, 1],
+                "results": ["cpu", "tie", "player"]
+            }
+        }
+
+class MatchRequest(BaseModel):
+    mode: str = Field(
+        ..., 
+        pattern="^(normal|imposible|adaptativo)$",
+        description="Modo de juego: normal, imposible o adaptativo"
+    )
+    rounds: int = Field(
+        5,
+        ge=1,
+        le=5,
+        description="Rondas de la partida (máximo 5 para respetar el rango de puntuación)"
+    )
+    
+    @field_validator('mode')
+    @classmethod
+    def validate_mode(cls, v):
+        v = v.lower().strip()
+        if v not in settings.ALLOWED_GAME_MODES:
+            raise ValueError(f'Modo inválido. Debe ser uno de: {settings.ALLOWED_GAME_MODES}')
+        return v
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "mode": "normal",
+                "rounds": 5
+            }
+        }
+
+class MatchResponse(BaseModel):
+    match_id: str = Field(..., description="Identificador de la partida")
+    mode: str = Field(..., description="Modo de juego")
+    rounds: int = Field(..., description="Rondas de la partida")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "match_id": "k3J9x0bQe1mZ4r2W",
+                "mode": "normal",
+                "rounds": 5
+            }
+        }
+
+class ModeStats(BaseModel):
+    rounds: int = Field(..., description="Rondas jugadas")
+    results: Dict[str, int] = Field(..., description="Rondas por resultado: player, cpu o tie")
+    player_moves: Dict[str, int] = Field(..., description="Jugadas del jugador: piedra, papel o tijera")
+    cpu_moves: Dict[str, int] = Field(..., description="Jugadas de la CPU: piedra, papel o tijera")
+
+class GameStatsResponse(BaseModel):
+    modes: Dict[str, ModeStats] = Field(..., description="Estadísticas por modo de juego")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "modes": {
+                    "normal": {
+                        "rounds": 6,
+                        "results": {"tie": 2, "player": 1, "cpu": 3},
+                        "player_moves": {"piedra": 3, "papel": 2, "tijera": 1},
+                        "cpu_moves": {"piedra": 1, "papel": 4, "tijera": 1}
+                    }
+                }
+            }
+        }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional
 import re
@@ -11,18 +11,23 @@ class LeaderboardEntry(BaseModel):
         max_length=settings.MAX_PLAYER_NAME_LENGTH,
         description="Nombre del jugador (1-5 caracteres)"
     )
-    score: int = Field(
-        ..., 
+    score: Optional[int] = Field(
+        None, 
         ge=-500, 
         le=500,
-        description="Puntuación del jugador"
+        description="Puntuación del jugador (se ignora si se envía match_id)"
     )
     mode: str = Field(
         ..., 
-        pattern="^(normal|imposible)$",
+        pattern="^(normal|imposible|adaptativo)$",
         description="Modo de juego"
     )
     timestamp: Optional[datetime] = None
+    match_id: Optional[str] = Field(
+        None,
+        max_length=32,
+        description="Partida del servidor; la puntuación se calcula en el servidor"
+    )
     
     @field_validator('player_name')
     @classmethod
@@ -56,10 +61,16 @@ class LeaderboardEntry(BaseModel):
     def validate_score(cls, v):
         # Validar que el score esté en un rango razonable
         # Máximo: 5 victorias = 500, Mínimo: 5 derrotas = -500
-        if v < -500 or v > 500:
+        if v is not None and (v < -500 or v > 500):
             raise ValueError('Puntuación fuera de rango válido')
         return v
     
+    @model_validator(mode='after')
+    def require_score_or_match(self):
+        if self.score is None and self.match_id is None:
+            raise ValueError('Se requiere score o match_id')
+        return self
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -81,4 +92,22 @@ class LeaderboardResponse(BaseModel):
                 "score": 300,
                 "timestamp": "2025-01-05T12:00:00"
             }
-        }
\ No newline at end of file
+        }
+
+class RankResponse(BaseModel):
+    mode: str = Field(..., description="Modo de juego")
+    score: int = Field(..., description="Puntuación consultada")
+    rank: int = Field(..., description="Posición (los empates comparten posición)")
+    total: int = Field(..., description="Total de puntuaciones registradas")
+    percentile: float = Field(..., description="Porcentaje de puntuaciones menores")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "mode": "normal",
+                "score": 300,
+                "rank": 12,
+                "total": 4800,
+                "percentile": 97.5
+            }
+        }
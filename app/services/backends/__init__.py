@@ -0,0 +1,15 @@
+from app.config import settings
+from app.services.backends.base import LeaderboardBackend
+
+
+def create_backend() -> LeaderboardBackend:
+    """Instanciar el almacenamiento configurado en STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "sqlite":
+        from app.services.backends.sqlite import SQLiteBackend
+        return SQLiteBackend()
+
+    if settings.STORAGE_BACKEND == "mongo":
+        from app.services.backends.mongo import MongoBackend
+        return MongoBackend()
+
+    raise ValueError(f"STORAGE_BACKEND inválido: {settings.STORAGE_BACKEND}")
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Ventanas de tiempo del leaderboard
+WINDOWS = ("day", "week")
+
+
+def window_buckets(timestamp: datetime) -> Dict[str, int]:
+    """
+    Ventanas (UTC) a las que pertenece un timestamp:
+    day = días desde el epoch, week = semana ISO (empieza el lunes)
+    """
+    day = (timestamp - _EPOCH).days
+    # El 1970-01-01 fue jueves: +3 alinea las semanas al lunes
+    return {"day": day, "week": (day + 3) // 7}
+
+
+class LeaderboardBackend:
+    """
+    Interfaz de almacenamiento del leaderboard.
+
+    Los documentos tienen la forma
+    {"_id": ObjectId, "player_name": str, "score": int, "timestamp": datetime}
+    y cada modo de juego se guarda por separado (leaderboard_<modo>).
+    Además se mantiene la mejor puntuación de cada jugador por modo
+    (leaderboard_<modo>_best), de tamaño acotado por el número de jugadores,
+    y una copia de las puntuaciones recientes con su día y semana
+    (leaderboard_<modo>_recent) que expira tras LEADERBOARD_WINDOW_RETENTION_DAYS.
+    La compactación mueve entradas antiguas del historial a
+    leaderboard_<modo>_archive y suma sus puntuaciones en
+    leaderboard_<modo>_archive_scores, para que las posiciones no cambien.
+    """
+
+    name = "base"
+    # Si puede notificar inserciones de otras instancias (watch_entries)
+    supports_watch = False
+
+    async def connect(self):
+        """Preparar la conexión sin esperar a la red (ver warm_up)"""
+        raise NotImplementedError
+
+    async def warm_up(self):
+        """Verificar que el almacenamiento responde y abrir conexiones (en segundo plano)"""
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+    async def create_indexes(self):
+        raise NotImplementedError
+
+    async def insert(self, mode: str, document: dict):
+        raise NotImplementedError
+
+    async def insert_many(self, mode: str, documents: List[dict]) -> Dict[int, Exception]:
+        """Insertar sin orden; devuelve {índice: excepción} de los que fallaron"""
+        raise NotImplementedError
+
+    @staticmethod
+    def is_duplicate(error: Exception) -> bool:
+        """Si la escritura falló por una clave única repetida (Idempotency-Key)"""
+        raise NotImplementedError
+
+    async def find_by_idempotency_key(self, mode: str, key: str) -> Optional[dict]:
+        """Entrada del historial guardada con esa Idempotency-Key, si existe"""
+        raise NotImplementedError
+
+    async def find_top(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        """
+        Mejores puntuaciones (score, timestamp e _id descendentes), incluyendo _id.
+        Con primary=True se lee sin réplicas atrasadas (recargas de los cachés).
+        """
+        raise NotImplementedError
+
+    async def find_page(self, mode: str, after: Tuple[int, datetime, str], limit: int) -> List[dict]:
+        """
+        Entradas por debajo de la clave (score, timestamp, id), en el mismo
+        orden que find_top: cada página es una búsqueda en el índice
+        """
+        raise NotImplementedError
+
+    async def update_best(self, mode: str, documents: List[dict]):
+        """Subir la mejor puntuación de cada jugador si alguno de los documentos la supera"""
+        raise NotImplementedError
+
+    async def backfill_best(self, mode: str) -> bool:
+        """Construir las mejores puntuaciones desde el historial si aún no existen"""
+        raise NotImplementedError
+
+    async def find_top_best(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        """Mejores puntuaciones, una por jugador (_id = player_name)"""
+        raise NotImplementedError
+
+    async def insert_recent(self, mode: str, documents: List[dict]):
+        """Copiar puntuaciones a la colección de ventanas (día y semana)"""
+        raise NotImplementedError
+
+    async def find_top_window(self, mode: str, window: str, bucket: int, limit: int, primary: bool = False) -> List[dict]:
+        """Mejores puntuaciones de un día o semana (ver window_buckets), incluyendo _id"""
+        raise NotImplementedError
+
+    def watch_entries(self) -> AsyncIterator[Tuple[str, dict]]:
+        """Inserciones en el historial de cualquier instancia: (modo, documento)"""
+        raise NotImplementedError
+
+    async def score_histogram(self, mode: str, primary: bool = False) -> Dict[int, int]:
+        """Cantidad de entradas por puntuación, archivadas incluidas: {score: cantidad}"""
+        raise NotImplementedError
+
+    async def increment_stats(self, deltas: Dict[str, Dict[str, int]]):
+        """Sumar contadores de juego en una sola escritura: {modo: {campo: delta}}"""
+        raise NotImplementedError
+
+    async def get_stats(self, primary: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Contadores de juego de todas las instancias: {modo: {campo: total}}
+        Con primary=True se leen después del último $inc, sin réplicas atrasadas.
+        """
+        raise NotImplementedError
+
+    async def find_archivable(self, mode: str, before: datetime, after: Optional[str], limit: int) -> List[dict]:
+        """
+        Entradas del historial anteriores a `before`, en orden de _id
+        ascendente a partir de `after` (el _id de la última revisada)
+        """
+        raise NotImplementedError
+
+    async def find_best(self, mode: str, player_names: List[str]) -> Dict[str, Tuple[int, datetime]]:
+        """Mejor (score, timestamp) de cada jugador"""
+        raise NotImplementedError
+
+    async def archive_supported(self) -> bool:
+        """Si el almacenamiento puede mover entradas al archivo de forma atómica"""
+        raise NotImplementedError
+
+    async def archive(self, mode: str, documents: List[dict]):
+        """
+        Mover entradas del historial al archivo y sumar sus puntuaciones, de
+        forma atómica; se puede repetir sin duplicar ni volver a contar
+        """
+        raise NotImplementedError
+
+    async def storage_bytes(self, mode: str) -> Optional[int]:
+        """Tamaño del historial con sus índices, o None si no se puede medir"""
+        raise NotImplementedError
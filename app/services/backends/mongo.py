@@ -0,0 +1,556 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, OperationFailure, WriteError
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+from app.config import settings
+from app.services.backends.base import LeaderboardBackend, WINDOWS, window_buckets
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Registrar la latencia de cada comando de MongoDB por colección.
+
+    pymongo llama a estos métodos desde los hilos de Motor; solo se usan
+    operaciones atómicas de dict para no añadir locks al camino crítico.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, tuple] = {}
+
+    @staticmethod
+    def _collection(event) -> str:
+        command = event.command
+        if event.command_name == "getMore":
+            return str(command.get("collection", ""))
+        target = command.get(event.command_name)
+        return target if isinstance(target, str) else ""
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.command_name,
+            self._collection(event),
+        )
+
+    def _finish(self, event, outcome: str):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        command, collection = pending
+        metrics.observe_db_command(command, collection, outcome, event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Telemetría del pool de conexiones: tiempo de espera por una conexión,
+    solicitudes en cola, conexiones abiertas y en uso.
+
+    Los contadores cambian desde varios hilos y, a diferencia de un
+    histograma, un error de carrera no se corrige solo; por eso se
+    actualizan con un lock (fuera del camino de las consultas).
+    """
+
+    def __init__(self, pool: str):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._counts = {"waiting": 0, "in_use": 0, "open": 0}
+
+    def _add(self, state: str, delta: int):
+        with self._lock:
+            self._counts[state] += delta
+            metrics.set_db_pool(self.pool, state, self._counts[state])
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_checked_out(self, event):
+        self._add("waiting", -1)
+        self._add("in_use", 1)
+        metrics.observe_pool_checkout(self.pool, "ok", event.duration or 0.0)
+
+    def connection_check_out_failed(self, event):
+        self._add("waiting", -1)
+        metrics.observe_pool_checkout(self.pool, event.reason, event.duration or 0.0)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+_READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def _read_preference():
+    """Preferencia de lectura del leaderboard según la configuración"""
+    mode = settings.MONGODB_READ_PREFERENCE
+    if mode == "primary":
+        return Primary()
+    if mode not in _READ_PREFERENCES:
+        raise ValueError(f"MONGODB_READ_PREFERENCE inválido: {mode}")
+
+    staleness = settings.MONGODB_MAX_STALENESS_SECONDS
+    if 0 < staleness < 90:
+        # Mínimo que acepta el driver (heartbeat + idleWritePeriod)
+        raise ValueError("MONGODB_MAX_STALENESS_SECONDS debe ser -1 o >= 90")
+    return _READ_PREFERENCES[mode](max_staleness=staleness if staleness > 0 else -1)
+
+
+class MongoBackend(LeaderboardBackend):
+    """Almacenamiento en MongoDB Atlas mediante Motor"""
+
+    name = "mongo"
+    supports_watch = True
+
+    def __init__(self):
+        # Escrituras e índices (primario) y lecturas del leaderboard con su
+        # propio pool, para que una ráfaga de guardados no deje sin
+        # conexiones a las lecturas
+        self.client: AsyncIOMotorClient = None
+        self.read_client: AsyncIOMotorClient = None
+        self.read_database = None
+        # Si el despliegue admite transacciones (se averigua al compactar)
+        self._transactions: Optional[bool] = None
+
+    @property
+    def database(self):
+        return self.client[settings.DATABASE_NAME]
+
+    def _database(self, read: bool):
+        return self.read_database if read else self.database
+
+    def collection(self, mode: str, read: bool = False):
+        return self._database(read)[f"leaderboard_{mode}"]
+
+    def best_collection(self, mode: str, read: bool = False):
+        return self._database(read)[f"leaderboard_{mode}_best"]
+
+    def recent_collection(self, mode: str, read: bool = False):
+        return self._database(read)[f"leaderboard_{mode}_recent"]
+
+    def archive_collection(self, mode: str):
+        return self.database[f"leaderboard_{mode}_archive"]
+
+    def archive_scores_collection(self, mode: str, read: bool = False):
+        return self._database(read)[f"leaderboard_{mode}_archive_scores"]
+
+    def stats_collection(self, read: bool = False):
+        return self._database(read)["game_stats"]
+
+    @staticmethod
+    def _create_client(pool: str, max_pool_size: int) -> AsyncIOMotorClient:
+        return AsyncIOMotorClient(
+            settings.MONGODB_URI,
+            maxPoolSize=max_pool_size,  # Limitar conexiones simultáneas
+            minPoolSize=min(settings.MONGODB_MIN_POOL_SIZE, max_pool_size),
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS or None,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+            event_listeners=[CommandMetricsListener(), PoolMetricsListener(pool)],
+        )
+
+    @staticmethod
+    async def _warm_up(client: AsyncIOMotorClient, connections: int, read_preference=None):
+        """Abrir las conexiones mínimas del pool antes de recibir tráfico"""
+        await asyncio.gather(*(
+            client.admin.command("ping", read_preference=read_preference or Primary())
+            for _ in range(max(1, connections))
+        ))
+
+    async def connect(self):
+        logger.info("🔌 Conectando a MongoDB...")
+
+        if not settings.MONGODB_URI:
+            raise ValueError("MONGODB_URI no está configurado")
+
+        # Configuración de conexión segura
+        self.client = self._create_client("write", settings.MONGODB_MAX_POOL_SIZE)
+        if settings.MONGODB_SEPARATE_READ_POOL:
+            self.read_client = self._create_client("read", settings.MONGODB_READ_MAX_POOL_SIZE)
+        else:
+            self.read_client = self.client
+        self.read_database = self.read_client.get_database(
+            settings.DATABASE_NAME,
+            read_preference=_read_preference()
+        )
+
+        # Crear los clientes no abre conexiones; warm_up() las verifica
+        # en segundo plano sin bloquear el arranque
+
+    async def warm_up(self):
+        # Verificar conexión y precalentar los pools
+        pools = [self._warm_up(self.client, settings.MONGODB_MIN_POOL_SIZE)]
+        if self.read_client is not self.client:
+            pools.append(self._warm_up(
+                self.read_client,
+                settings.MONGODB_MIN_POOL_SIZE,
+                self.read_database.read_preference
+            ))
+        await asyncio.gather(*pools)
+        logger.info("✅ Conexión exitosa a MongoDB Atlas!")
+
+    async def close(self):
+        logger.info("🔌 Cerrando conexión a MongoDB...")
+        if self.read_client and self.read_client is not self.client:
+            self.read_client.close()
+        if self.client:
+            self.client.close()
+            logger.info("✅ Conexión cerrada")
+
+    def _index_models(self, mode: str) -> list:
+        """(colección, índices) de un modo"""
+        return [
+            (self.collection(mode), [
+                IndexModel([("score", DESCENDING)], name="score_desc"),
+                # Orden total del leaderboard: top y páginas (keyset) sin ordenar en memoria
+                IndexModel(
+                    [("score", DESCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                    name="score_timestamp_id_desc"
+                ),
+                IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+                IndexModel([("player_name", 1), ("timestamp", DESCENDING)], name="player_recent")
+            ] + ([
+                # Sparse: solo las entradas enviadas con Idempotency-Key
+                IndexModel([("idempotency_key", 1)], name="idempotency_key_unique", unique=True, sparse=True)
+            ] if settings.IDEMPOTENCY_UNIQUE_INDEX else [])),
+            (self.best_collection(mode), [
+                IndexModel(
+                    [("best.score", DESCENDING), ("best.timestamp", DESCENDING)],
+                    name="best_score_desc"
+                )
+            ]),
+            # Igualdad en la ventana + orden por score: el top de un día o
+            # semana se lee del índice igual que el top histórico
+            (self.recent_collection(mode), [
+                IndexModel(
+                    [(window, 1), ("score", DESCENDING), ("timestamp", DESCENDING)],
+                    name=f"{window}_score_desc"
+                )
+                for window in WINDOWS
+            ] + [
+                IndexModel(
+                    [("timestamp", 1)],
+                    name="timestamp_ttl",
+                    expireAfterSeconds=settings.LEADERBOARD_WINDOW_RETENTION_DAYS * 86400
+                )
+            ]),
+        ]
+
+    @staticmethod
+    async def _ensure_indexes(collection, models: list) -> int:
+        """Crear solo los índices que faltan; devuelve cuántos se crearon"""
+        existing = set()
+        async for index in collection.list_indexes():
+            existing.add(index["name"])
+
+        missing = [model for model in models if model.document["name"] not in existing]
+        if missing:
+            await collection.create_indexes(missing)
+        return len(missing)
+
+    async def create_indexes(self):
+        logger.info("📊 Creando índices en MongoDB...")
+
+        # Todas las colecciones a la vez; cada build corre en el servidor
+        created = await asyncio.gather(*(
+            self._ensure_indexes(collection, models)
+            for mode in settings.ALLOWED_GAME_MODES
+            for collection, models in self._index_models(mode)
+        ))
+        if not sum(created):
+            logger.info("📊 Los índices ya existían")
+
+    async def insert(self, mode: str, document: dict):
+        await self.collection(mode).insert_one(document)
+
+    async def insert_many(self, mode: str, documents: List[dict]) -> Dict[int, Exception]:
+        try:
+            await self.collection(mode).insert_many(documents, ordered=False)
+            return {}
+        except BulkWriteError as e:
+            return {
+                error["index"]: WriteError(error.get("errmsg", ""), error.get("code"), error)
+                for error in e.details.get("writeErrors", [])
+            }
+
+    @staticmethod
+    def is_duplicate(error: Exception) -> bool:
+        return isinstance(error, WriteError) and error.code == 11000
+
+    async def find_by_idempotency_key(self, mode: str, key: str) -> Optional[dict]:
+        # En el primario: la otra instancia acaba de escribirla
+        return await self.collection(mode).find_one(
+            {"idempotency_key": key},
+            {"_id": 1, "player_name": 1, "score": 1, "timestamp": 1}
+        )
+
+    _TOP_SORT = [("score", DESCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+    async def find_top(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        # Índice score_timestamp_id_desc: el mismo orden que las páginas
+        cursor = self.collection(mode, read=not primary).find(
+            {},
+            {"_id": 1, "player_name": 1, "score": 1, "timestamp": 1}
+        ).sort(self._TOP_SORT).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+    async def find_page(self, mode: str, after, limit: int) -> List[dict]:
+        score, timestamp, entry_id = after
+        entry_id = ObjectId(entry_id)
+        # (score, timestamp, _id) < after; cada rama es un rango del mismo índice
+        query = {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "timestamp": {"$lt": timestamp}},
+            {"score": score, "timestamp": timestamp, "_id": {"$lt": entry_id}},
+        ]}
+        cursor = self.collection(mode, read=True).find(
+            query,
+            {"_id": 1, "player_name": 1, "score": 1, "timestamp": 1}
+        ).sort(self._TOP_SORT).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+    async def update_best(self, mode: str, documents: List[dict]):
+        # $max compara el subdocumento campo a campo: primero score y, en
+        # empate, el timestamp más reciente. Un upsert por jugador (_id)
+        # es atómico sin leer antes el valor actual.
+        await self.best_collection(mode).bulk_write(
+            [
+                UpdateOne(
+                    {"_id": document["player_name"]},
+                    {"$max": {"best": {
+                        "score": document["score"],
+                        "timestamp": document["timestamp"],
+                    }}},
+                    upsert=True,
+                )
+                for document in documents
+            ],
+            ordered=False,
+        )
+
+    async def backfill_best(self, mode: str) -> bool:
+        if await self.best_collection(mode).find_one({}, {"_id": 1}) is not None:
+            return False
+
+        # Agrupar el historial por jugador y fusionar con $max, por si
+        # llegan escrituras mientras se ejecuta
+        await self.collection(mode).aggregate([
+            {"$group": {
+                "_id": "$player_name",
+                "best": {"$max": {"score": "$score", "timestamp": "$timestamp"}},
+            }},
+            {"$merge": {
+                "into": f"leaderboard_{mode}_best",
+                "whenMatched": [{"$set": {"best": {"$max": ["$best", "$$new.best"]}}}],
+                "whenNotMatched": "insert",
+            }},
+        ]).to_list(length=None)
+        return True
+
+    async def find_top_best(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        cursor = self.best_collection(mode, read=not primary).find().sort(
+            [("best.score", DESCENDING), ("best.timestamp", DESCENDING)]
+        ).limit(limit)
+
+        return [
+            {
+                "_id": document["_id"],
+                "player_name": document["_id"],
+                "score": document["best"]["score"],
+                "timestamp": document["best"]["timestamp"],
+            }
+            async for document in cursor
+        ]
+
+    async def insert_recent(self, mode: str, documents: List[dict]):
+        try:
+            await self.recent_collection(mode).insert_many(
+                [{**document, **window_buckets(document["timestamp"])} for document in documents],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            # Duplicados de un reintento: la copia ya existe
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+    async def find_top_window(self, mode: str, window: str, bucket: int, limit: int, primary: bool = False) -> List[dict]:
+        cursor = self.recent_collection(mode, read=not primary).find(
+            {window: bucket},
+            {"_id": 1, "player_name": 1, "score": 1, "timestamp": 1}
+        ).sort([("score", DESCENDING), ("timestamp", DESCENDING)]).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+    async def watch_entries(self):
+        # Change stream sobre la base de datos (requiere replica set, como
+        # Atlas); pymongo reanuda solo ante errores transitorios
+        collections = {f"leaderboard_{mode}": mode for mode in settings.ALLOWED_GAME_MODES}
+        pipeline = [{"$match": {
+            "operationType": "insert",
+            "ns.coll": {"$in": list(collections)},
+        }}]
+
+        async with self.database.watch(pipeline) as stream:
+            async for change in stream:
+                yield collections[change["ns"]["coll"]], change["fullDocument"]
+
+    async def score_histogram(self, mode: str, primary: bool = False) -> Dict[int, int]:
+        # A lo sumo 1001 grupos (uno por puntuación posible)
+        cursor = self.collection(mode, read=not primary).aggregate([
+            {"$group": {"_id": "$score", "count": {"$sum": 1}}}
+        ])
+        histogram = {int(group["_id"]): group["count"] async for group in cursor}
+        # Entradas archivadas: sumadas aparte, sin recorrer el archivo
+        async for group in self.archive_scores_collection(mode, read=not primary).find():
+            score = int(group["_id"])
+            histogram[score] = histogram.get(score, 0) + group["count"]
+        return histogram
+
+    async def increment_stats(self, deltas: Dict[str, Dict[str, int]]):
+        # Un documento por modo; "results.tie" etc. son rutas de subdocumentos
+        await self.stats_collection().bulk_write(
+            [
+                UpdateOne({"_id": mode}, {"$inc": fields}, upsert=True)
+                for mode, fields in deltas.items()
+            ],
+            ordered=False,
+        )
+
+    async def get_stats(self, primary: bool = False) -> Dict[str, Dict[str, int]]:
+        stats = {}
+        async for document in self.stats_collection(read=not primary).find():
+            stats[document["_id"]] = {
+                f"{group}.{name}": value
+                for group, counters in document.items() if group != "_id"
+                for name, value in counters.items()
+            }
+        return stats
+
+    async def find_archivable(self, mode: str, before: datetime, after: Optional[str], limit: int) -> List[dict]:
+        # Los _id crecen con el tiempo: el rango sobre _id acota el
+        # recorrido del índice a las entradas anteriores a `before`
+        id_range = {"$lt": ObjectId.from_datetime(before)}
+        if after is not None:
+            id_range["$gt"] = ObjectId(after)
+
+        cursor = self.collection(mode).find(
+            {"_id": id_range, "timestamp": {"$lt": before}}
+        ).sort("_id", ASCENDING).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+    async def find_best(self, mode: str, player_names: List[str]) -> Dict[str, tuple]:
+        cursor = self.best_collection(mode).find({"_id": {"$in": list(player_names)}})
+        return {
+            document["_id"]: (document["best"]["score"], document["best"]["timestamp"])
+            async for document in cursor
+        }
+
+    async def archive_supported(self) -> bool:
+        # Mover al archivo requiere transacciones (replica set o sharding)
+        if self._transactions is None:
+            hello = await self.client.admin.command("hello")
+            self._transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        return self._transactions
+
+    async def archive(self, mode: str, documents: List[dict]):
+        ids = [document["_id"] for document in documents]
+
+        async def move(session):
+            # Releer dentro de la transacción: solo se mueve y se cuenta lo
+            # que sigue en el historial, así repetir un lote no cuenta dos veces
+            present = await self.collection(mode).find(
+                {"_id": {"$in": ids}}, session=session
+            ).to_list(length=None)
+            if not present:
+                return
+
+            # Copias que ya existen en el archivo (p. ej. de una versión
+            # anterior sin transacción) no se vuelven a copiar ni a contar
+            archived = {
+                document["_id"]
+                async for document in self.archive_collection(mode).find(
+                    {"_id": {"$in": ids}}, {"_id": 1}, session=session
+                )
+            }
+            moved = [document for document in present if document["_id"] not in archived]
+            if moved:
+                await self.archive_collection(mode).insert_many(moved, ordered=False, session=session)
+                await self.archive_scores_collection(mode).bulk_write(
+                    [
+                        UpdateOne({"_id": score}, {"$inc": {"count": count}}, upsert=True)
+                        for score, count in Counter(document["score"] for document in moved).items()
+                    ],
+                    ordered=False,
+                    session=session,
+                )
+
+            await self.collection(mode).delete_many(
+                {"_id": {"$in": [document["_id"] for document in present]}}, session=session
+            )
+
+        # Copia, conteo y borrado juntos, como la transacción de SQLite
+        async with await self.client.start_session() as session:
+            await session.with_transaction(move)
+
+    async def storage_bytes(self, mode: str) -> Optional[int]:
+        try:
+            stats = await self.collection(mode).aggregate([
+                {"$collStats": {"storageStats": {}}}
+            ]).to_list(length=None)
+        except OperationFailure as e:
+            logger.warning("⚠️ No se pudo medir leaderboard_%s: %s", mode, e)
+            return None
+        # Un documento por shard
+        return sum(
+            stat["storageStats"]["size"] + stat["storageStats"]["totalIndexSize"]
+            for stat in stats
+        )
@@ -0,0 +1,435 @@
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from app.config import settings
+from app.services.backends.base import LeaderboardBackend, WINDOWS, window_buckets
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class SQLiteBackend(LeaderboardBackend):
+    """
+    Almacenamiento embebido en SQLite (modo WAL) para instalaciones
+    pequeñas, desarrollo local y benchmarks.
+
+    Las consultas usan el índice (score DESC, timestamp DESC) y tardan
+    microsegundos, así que se ejecutan directamente en el event loop.
+    Con SQLITE_PATH=":memory:" la base vive solo en memoria.
+    """
+
+    name = "sqlite"
+
+    def __init__(self):
+        self.connection: sqlite3.Connection = None
+        # Último día en que se purgaron las ventanas expiradas
+        self.purged_day = None
+
+    @staticmethod
+    def table(mode: str) -> str:
+        # Los modos vienen de ALLOWED_GAME_MODES, nunca del cliente
+        return f"leaderboard_{mode}"
+
+    @classmethod
+    def best_table(cls, mode: str) -> str:
+        return f"{cls.table(mode)}_best"
+
+    @classmethod
+    def recent_table(cls, mode: str) -> str:
+        return f"{cls.table(mode)}_recent"
+
+    @classmethod
+    def archive_table(cls, mode: str) -> str:
+        return f"{cls.table(mode)}_archive"
+
+    @classmethod
+    def archive_scores_table(cls, mode: str) -> str:
+        return f"{cls.table(mode)}_archive_scores"
+
+    async def connect(self):
+        logger.info("🔌 Abriendo SQLite en %s...", settings.SQLITE_PATH)
+
+        self.connection = sqlite3.connect(
+            settings.SQLITE_PATH,
+            isolation_level=None,  # autocommit; las transacciones son explícitas
+            check_same_thread=False,
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        for mode in settings.ALLOWED_GAME_MODES:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table(mode)} ("
+                "id TEXT PRIMARY KEY, "
+                "player_name TEXT NOT NULL, "
+                "score INTEGER NOT NULL, "
+                "timestamp INTEGER NOT NULL, "
+                "idempotency_key TEXT)"
+            )
+            columns = {row[1] for row in self.connection.execute(f"PRAGMA table_info({self.table(mode)})")}
+            if "idempotency_key" not in columns:
+                # Bases creadas antes de Idempotency-Key
+                self.connection.execute(f"ALTER TABLE {self.table(mode)} ADD COLUMN idempotency_key TEXT")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.best_table(mode)} ("
+                "player_name TEXT PRIMARY KEY, "
+                "score INTEGER NOT NULL, "
+                "timestamp INTEGER NOT NULL)"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.recent_table(mode)} ("
+                "id TEXT PRIMARY KEY, "
+                "player_name TEXT NOT NULL, "
+                "score INTEGER NOT NULL, "
+                "timestamp INTEGER NOT NULL, "
+                "day INTEGER NOT NULL, "
+                "week INTEGER NOT NULL)"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.archive_table(mode)} ("
+                "id TEXT PRIMARY KEY, "
+                "player_name TEXT NOT NULL, "
+                "score INTEGER NOT NULL, "
+                "timestamp INTEGER NOT NULL, "
+                "idempotency_key TEXT)"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.archive_scores_table(mode)} ("
+                "score INTEGER PRIMARY KEY, "
+                "count INTEGER NOT NULL)"
+            )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS game_stats ("
+            "mode TEXT NOT NULL, "
+            "field TEXT NOT NULL, "
+            "count INTEGER NOT NULL, "
+            "PRIMARY KEY (mode, field))"
+        )
+        logger.info("✅ SQLite listo")
+
+    async def warm_up(self):
+        self.connection.execute("SELECT 1")
+
+    async def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    async def create_indexes(self):
+        logger.info("📊 Creando índices en SQLite...")
+
+        for mode in settings.ALLOWED_GAME_MODES:
+            table = self.table(mode)
+            self.connection.executescript(
+                f"CREATE INDEX IF NOT EXISTS {table}_score_desc "
+                f"ON {table} (score DESC, timestamp DESC);"
+                f"CREATE INDEX IF NOT EXISTS {table}_score_timestamp_id_desc "
+                f"ON {table} (score DESC, timestamp DESC, id DESC);"
+                f"CREATE INDEX IF NOT EXISTS {table}_timestamp_desc "
+                f"ON {table} (timestamp DESC);"
+                f"CREATE INDEX IF NOT EXISTS {table}_player_recent "
+                f"ON {table} (player_name, timestamp DESC);"
+                f"CREATE INDEX IF NOT EXISTS {table}_best_score_desc "
+                f"ON {self.best_table(mode)} (score DESC, timestamp DESC);"
+            )
+            for window in WINDOWS:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{window}_score_desc "
+                    f"ON {self.recent_table(mode)} ({window}, score DESC, timestamp DESC)"
+                )
+            if settings.IDEMPOTENCY_UNIQUE_INDEX:
+                self.connection.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_idempotency_key "
+                    f"ON {table} (idempotency_key) WHERE idempotency_key IS NOT NULL"
+                )
+
+    @staticmethod
+    def _row(document: dict) -> tuple:
+        return (
+            str(document["_id"]),
+            document["player_name"],
+            document["score"],
+            _to_micros(document["timestamp"]),
+        )
+
+    def _insert_sql(self, mode: str) -> str:
+        return (
+            f"INSERT INTO {self.table(mode)} "
+            "(id, player_name, score, timestamp, idempotency_key) VALUES (?, ?, ?, ?, ?)"
+        )
+
+    @classmethod
+    def _entry_row(cls, document: dict) -> tuple:
+        return cls._row(document) + (document.get("idempotency_key"),)
+
+    async def insert(self, mode: str, document: dict):
+        self.connection.execute(self._insert_sql(mode), self._entry_row(document))
+
+    async def insert_many(self, mode: str, documents: List[dict]) -> Dict[int, Exception]:
+        failures = {}
+        sql = self._insert_sql(mode)
+
+        self.connection.execute("BEGIN")
+        try:
+            for index, document in enumerate(documents):
+                try:
+                    self.connection.execute(sql, self._entry_row(document))
+                except sqlite3.IntegrityError as e:
+                    failures[index] = e
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return failures
+
+    @staticmethod
+    def is_duplicate(error: Exception) -> bool:
+        return isinstance(error, sqlite3.IntegrityError)
+
+    async def find_by_idempotency_key(self, mode: str, key: str) -> Optional[dict]:
+        row = self.connection.execute(
+            f"SELECT id, player_name, score, timestamp FROM {self.table(mode)} "
+            "WHERE idempotency_key = ?",
+            (key,)
+        ).fetchone()
+        return self._document(row) if row is not None else None
+
+    @staticmethod
+    def _document(row: tuple) -> dict:
+        return {
+            "_id": ObjectId(row[0]),
+            "player_name": row[1],
+            "score": row[2],
+            "timestamp": _from_micros(row[3]),
+        }
+
+    async def find_top(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        rows = self.connection.execute(
+            f"SELECT id, player_name, score, timestamp FROM {self.table(mode)} "
+            "ORDER BY score DESC, timestamp DESC, id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+        return [self._document(row) for row in rows]
+
+    async def find_page(self, mode: str, after, limit: int) -> List[dict]:
+        score, timestamp, entry_id = after
+        # Comparación de tuplas: un rango sobre el índice score_timestamp_id_desc
+        rows = self.connection.execute(
+            f"SELECT id, player_name, score, timestamp FROM {self.table(mode)} "
+            "WHERE (score, timestamp, id) < (?, ?, ?) "
+            "ORDER BY score DESC, timestamp DESC, id DESC LIMIT ?",
+            (score, _to_micros(timestamp), entry_id, limit)
+        ).fetchall()
+
+        return [self._document(row) for row in rows]
+
+    def _upsert_best_sql(self, mode: str, source: str) -> str:
+        # Solo reemplaza si (score, timestamp) supera al actual, igual que $max
+        return (
+            f"INSERT INTO {self.best_table(mode)} (player_name, score, timestamp) {source} "
+            "ON CONFLICT(player_name) DO UPDATE SET "
+            "score = excluded.score, timestamp = excluded.timestamp "
+            "WHERE (excluded.score, excluded.timestamp) > (score, timestamp)"
+        )
+
+    async def update_best(self, mode: str, documents: List[dict]):
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                self._upsert_best_sql(mode, "VALUES (?, ?, ?)"),
+                [
+                    (document["player_name"], document["score"], _to_micros(document["timestamp"]))
+                    for document in documents
+                ]
+            )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    async def backfill_best(self, mode: str) -> bool:
+        if self.connection.execute(f"SELECT 1 FROM {self.best_table(mode)} LIMIT 1").fetchone():
+            return False
+
+        # "WHERE true" evita la ambigüedad de ON CONFLICT tras un SELECT
+        self.connection.execute(self._upsert_best_sql(
+            mode,
+            f"SELECT player_name, score, timestamp FROM {self.table(mode)} WHERE true"
+        ))
+        return True
+
+    async def find_top_best(self, mode: str, limit: int, primary: bool = False) -> List[dict]:
+        rows = self.connection.execute(
+            f"SELECT player_name, score, timestamp FROM {self.best_table(mode)} "
+            "ORDER BY score DESC, timestamp DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+        return [
+            {
+                "_id": row[0],
+                "player_name": row[0],
+                "score": row[1],
+                "timestamp": _from_micros(row[2]),
+            }
+            for row in rows
+        ]
+
+    async def insert_recent(self, mode: str, documents: List[dict]):
+        rows = []
+        for document in documents:
+            buckets = window_buckets(document["timestamp"])
+            rows.append(self._row(document) + (buckets["day"], buckets["week"]))
+
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO {self.recent_table(mode)} VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        self._purge_expired(rows[-1][4] if rows else None)
+
+    def _purge_expired(self, day):
+        """SQLite no tiene índices TTL: borrar lo expirado una vez por día"""
+        if day is None or day == self.purged_day:
+            return
+        self.purged_day = day
+        cutoff = day - settings.LEADERBOARD_WINDOW_RETENTION_DAYS
+        for mode in settings.ALLOWED_GAME_MODES:
+            self.connection.execute(
+                f"DELETE FROM {self.recent_table(mode)} WHERE day < ?",
+                (cutoff,)
+            )
+
+    async def find_top_window(self, mode: str, window: str, bucket: int, limit: int, primary: bool = False) -> List[dict]:
+        # window viene de WINDOWS, nunca directamente del cliente
+        rows = self.connection.execute(
+            f"SELECT id, player_name, score, timestamp FROM {self.recent_table(mode)} "
+            f"WHERE {window} = ? ORDER BY score DESC, timestamp DESC LIMIT ?",
+            (bucket, limit)
+        ).fetchall()
+
+        return [
+            {
+                "_id": ObjectId(row[0]),
+                "player_name": row[1],
+                "score": row[2],
+                "timestamp": _from_micros(row[3]),
+            }
+            for row in rows
+        ]
+
+    async def score_histogram(self, mode: str, primary: bool = False) -> Dict[int, int]:
+        histogram = dict(self.connection.execute(
+            f"SELECT score, COUNT(*) FROM {self.table(mode)} GROUP BY score"
+        ).fetchall())
+        for score, count in self.connection.execute(
+            f"SELECT score, count FROM {self.archive_scores_table(mode)}"
+        ):
+            histogram[score] = histogram.get(score, 0) + count
+        return histogram
+
+    async def increment_stats(self, deltas: Dict[str, Dict[str, int]]):
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                "INSERT INTO game_stats (mode, field, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(mode, field) DO UPDATE SET count = count + excluded.count",
+                [
+                    (mode, field, value)
+                    for mode, fields in deltas.items()
+                    for field, value in fields.items()
+                ]
+            )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    async def get_stats(self, primary: bool = False) -> Dict[str, Dict[str, int]]:
+        stats = {}
+        for mode, field, count in self.connection.execute("SELECT mode, field, count FROM game_stats"):
+            stats.setdefault(mode, {})[field] = count
+        return stats
+
+    async def find_archivable(self, mode: str, before: datetime, after: Optional[str], limit: int) -> List[dict]:
+        # Los id son ObjectId en hexadecimal: su orden es el de creación, así
+        # que el límite superior acota el recorrido de la clave primaria
+        rows = self.connection.execute(
+            f"SELECT id, player_name, score, timestamp FROM {self.table(mode)} "
+            "WHERE id > ? AND id < ? AND timestamp < ? ORDER BY id LIMIT ?",
+            (after or "", str(ObjectId.from_datetime(before)), _to_micros(before), limit)
+        ).fetchall()
+
+        return [self._document(row) for row in rows]
+
+    async def find_best(self, mode: str, player_names: List[str]) -> Dict[str, tuple]:
+        player_names = list(player_names)
+        placeholders = ", ".join("?" * len(player_names))
+        rows = self.connection.execute(
+            f"SELECT player_name, score, timestamp FROM {self.best_table(mode)} "
+            f"WHERE player_name IN ({placeholders})",
+            player_names
+        ).fetchall()
+
+        return {row[0]: (row[1], _from_micros(row[2])) for row in rows}
+
+    async def archive_supported(self) -> bool:
+        return True
+
+    async def archive(self, mode: str, documents: List[dict]):
+        ids = [str(document["_id"]) for document in documents]
+        placeholders = ", ".join("?" * len(ids))
+        table = self.table(mode)
+
+        # Una transacción: las filas nunca quedan en las dos tablas
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.execute(
+                f"INSERT INTO {self.archive_scores_table(mode)} (score, count) "
+                f"SELECT score, COUNT(*) FROM {table} WHERE id IN ({placeholders}) GROUP BY score "
+                "ON CONFLICT(score) DO UPDATE SET count = count + excluded.count",
+                ids
+            )
+            self.connection.execute(
+                f"INSERT INTO {self.archive_table(mode)} "
+                "(id, player_name, score, timestamp, idempotency_key) "
+                f"SELECT id, player_name, score, timestamp, idempotency_key FROM {table} "
+                f"WHERE id IN ({placeholders})",
+                ids
+            )
+            self.connection.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    async def storage_bytes(self, mode: str) -> Optional[int]:
+        # dbstat es opcional en la compilación de SQLite
+        try:
+            row = self.connection.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = ?)",
+                (self.table(mode),)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] or 0
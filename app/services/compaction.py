@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import settings
+from app.services.backends import LeaderboardBackend, create_backend
+from app.services.log import setup_logging, stop_logging
+
+logger = logging.getLogger(__name__)
+
+# Acumulado desde el arranque (métricas)
+totals = {"runs": 0, "rows_archived": 0, "bytes_freed": 0}
+
+
+def _key(entry: dict) -> tuple:
+    """Orden del leaderboard: (score, timestamp, id)"""
+    return (entry["score"], entry["timestamp"], str(entry["_id"]))
+
+
+def _is_best(entry: dict, best: dict) -> bool:
+    """Si la entrada es (o podría ser) la mejor de su jugador"""
+    player_best = best.get(entry["player_name"])
+    return player_best is None or (entry["score"], entry["timestamp"]) >= player_best
+
+
+async def _storage_bytes(backend: LeaderboardBackend, mode: str) -> Optional[int]:
+    try:
+        return await backend.storage_bytes(mode)
+    except Exception as e:
+        logger.warning("⚠️ No se pudo medir el historial de %s: %s", mode, e)
+        return None
+
+
+async def compact_mode(backend: LeaderboardBackend, mode: str, now: datetime = None) -> dict:
+    """
+    Mover al archivo las entradas de un modo que ya no afectan a ninguna
+    vista: fuera del top COMPACTION_KEEP_TOP, que no son la mejor de su
+    jugador y más antiguas que COMPACTION_RETENTION_DAYS.
+
+    Recorre el historial por lotes de COMPACTION_BATCH_SIZE con una pausa
+    entre lotes, hasta COMPACTION_MAX_ROWS_PER_RUN filas movidas.
+    """
+    report = {"mode": mode, "scanned": 0, "archived": 0, "bytes_freed": 0}
+
+    # El caché del leaderboard nunca debe quedar con entradas archivadas
+    keep_top = max(settings.COMPACTION_KEEP_TOP, settings.LEADERBOARD_CACHE_SIZE)
+    top = await backend.find_top(mode, keep_top)
+    if len(top) < keep_top:
+        return report
+    # Las entradas nuevas solo pueden subir este límite: lo que queda
+    # por debajo ahora sigue fuera del top
+    top_key = _key(top[-1])
+
+    before = (now or datetime.utcnow()) - timedelta(days=settings.COMPACTION_RETENTION_DAYS)
+    bytes_before = await _storage_bytes(backend, mode)
+    after = None
+
+    while report["archived"] < settings.COMPACTION_MAX_ROWS_PER_RUN:
+        limit = min(settings.COMPACTION_BATCH_SIZE, settings.COMPACTION_MAX_ROWS_PER_RUN - report["archived"])
+        entries = await backend.find_archivable(mode, before, after, limit)
+        if not entries:
+            break
+        after = str(entries[-1]["_id"])
+        report["scanned"] += len(entries)
+
+        # La mejor de un jugador solo puede subir, y nunca a una entrada antigua
+        best = await backend.find_best(mode, {entry["player_name"] for entry in entries})
+        batch = [
+            entry for entry in entries
+            if _key(entry) < top_key and not _is_best(entry, best)
+        ]
+        if batch:
+            await backend.archive(mode, batch)
+            report["archived"] += len(batch)
+
+        # Ceder la base de datos al tráfico entre lotes
+        await asyncio.sleep(settings.COMPACTION_BATCH_PAUSE_MS / 1000)
+
+    if report["archived"]:
+        # None si el almacenamiento no permite medirlo; 0 si las inserciones
+        # durante la compactación ocuparon más de lo que se liberó
+        bytes_after = await _storage_bytes(backend, mode) if bytes_before is not None else None
+        report["bytes_freed"] = max(0, bytes_before - bytes_after) if bytes_after is not None else None
+
+    return report
+
+
+async def compact(backend: LeaderboardBackend) -> list:
+    """Compactar todos los modos y registrar cuántas filas y bytes se liberaron"""
+    if not await backend.archive_supported():
+        logger.warning(
+            "⚠️ Compactación omitida: el almacenamiento '%s' no admite transacciones", backend.name
+        )
+        return []
+
+    reports = []
+    for mode in settings.ALLOWED_GAME_MODES:
+        report = await compact_mode(backend, mode)
+        reports.append(report)
+        logger.info(
+            "🗄️ Compactación de %s: %s filas archivadas de %s revisadas, %s bytes liberados",
+            mode, report["archived"], report["scanned"],
+            report["bytes_freed"] if report["bytes_freed"] is not None else "?"
+        )
+        totals["rows_archived"] += report["archived"]
+        totals["bytes_freed"] += report["bytes_freed"] or 0
+    totals["runs"] += 1
+    return reports
+
+
+async def _main():
+    """Ejecutar una compactación y salir (para cron o una ejecución manual)"""
+    setup_logging()
+    backend = create_backend()
+    await backend.connect()
+    try:
+        await backend.warm_up()
+        await compact(backend)
+    finally:
+        await backend.close()
+        stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,77 +1,215 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import base64
+import logging
 from app.config import settings
-from datetime import datetime
-from pymongo import DESCENDING, IndexModel
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from pydantic import TypeAdapter
+from app.services.backends import LeaderboardBackend, create_backend
+from app.services.backends.base import WINDOWS, window_buckets
+from app.services.leaderboard_cache import LeaderboardCache
+from app.services.rank_index import RankIndex
+from app.services.response_cache import ResponseCache
+from app.services.leaderboard_events import LeaderboardEvents
+from app.services.game_stats import GameStats
+from app.services.session_store import match_store
+from app.services.compaction import compact
+from app.schemas.leaderboard_schemas import LeaderboardResponse
+from app.services.write_buffer import LeaderboardWriteBuffer
+
+logger = logging.getLogger(__name__)
 
 class Database:
-    client: AsyncIOMotorClient = None
+    backend: LeaderboardBackend = None
+    cache_task: asyncio.Task = None
+    rank_task: asyncio.Task = None
+    write_buffer: LeaderboardWriteBuffer = None
+    # (modo, ventana) -> tablero del caché de la ventana actual
+    window_boards: dict = {}
+    # Recargas del caché en curso y las entradas aplicadas mientras tanto,
+    # que se vuelven a aplicar al terminar (la consulta puede no verlas)
+    reloads: int = 0
+    reloaded_entries: list = []
+    warm_up_task: asyncio.Task = None
+    change_stream_task: asyncio.Task = None
+    game_stats_task: asyncio.Task = None
+    compaction_task: asyncio.Task = None
+    # Estado que reporta /ready
+    ready: dict = {
+        "database": False,
+        "indexes": False,
+        "leaderboard_cache": False,
+        "rank_index": False,
+    }
     
 db = Database()
+leaderboard_cache = LeaderboardCache(size=settings.LEADERBOARD_CACHE_SIZE)
+rank_index = RankIndex()
+response_cache = ResponseCache()
+leaderboard_events = LeaderboardEvents()
+game_stats = GameStats(enabled=settings.GAME_STATS_ENABLED)
+
+_leaderboard_adapter = TypeAdapter(List[LeaderboardResponse])
 
-async def get_database():
-    return db.client[settings.DATABASE_NAME]
+def _encode_leaderboard(entries: list) -> bytes:
+    """Validar con el mismo esquema que el response_model y codificar a JSON"""
+    return _leaderboard_adapter.dump_json(_leaderboard_adapter.validate_python(entries))
 
-async def connect_to_mongo():
-    """Conectar a MongoDB al iniciar la aplicación"""
-    print("🔌 Conectando a MongoDB...")
+async def connect_to_database():
+    """
+    Preparar el almacenamiento configurado al iniciar la aplicación
     
+    No espera a la red: la verificación de la conexión, los índices y los
+    cachés se completan en segundo plano (ver start_warm_up).
+    """
     try:
-        # Configuración de conexión segura
-        db.client = AsyncIOMotorClient(
-            settings.MONGODB_URI,
-            maxPoolSize=10,  # Limitar conexiones simultáneas
-            minPoolSize=1,
-            maxIdleTimeMS=45000,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=10000,
-        )
-        
-        # Verificar conexión
-        await db.client.admin.command('ping')
-        print("✅ Conexión exitosa a MongoDB Atlas!")
-        
+        db.backend = create_backend()
+        await db.backend.connect()
     except Exception as e:
-        print(f"❌ Error conectando a MongoDB: {e}")
+        logger.error("❌ Error conectando al almacenamiento: %s", e)
         raise
 
-async def close_mongo_connection():
+async def close_database_connection():
     """Cerrar conexión al apagar la aplicación"""
-    print("🔌 Cerrando conexión a MongoDB...")
-    if db.client:
-        db.client.close()
-        print("✅ Conexión cerrada")
+    if db.backend:
+        await db.backend.close()
+    db.ready["database"] = False
+    db.ready["indexes"] = False
 
 async def create_indexes():
-    """Crear índices para optimizar consultas y garantizar unicidad"""
-    print("📊 Creando índices en MongoDB...")
+    """
+    Crear índices para optimizar consultas y garantizar unicidad,
+    reintentando con espera exponencial (un fallo pasajero no deja
+    /ready en 503 hasta reiniciar)
+    """
+    delay = 1
+    while True:
+        try:
+            await db.backend.create_indexes()
+            db.ready["indexes"] = True
+            logger.info("✅ Índices creados exitosamente")
+            return
+        except Exception as e:
+            logger.warning("⚠️ Error creando índices, reintentando en %ss: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+def readiness() -> dict:
+    """Qué partes del almacenamiento ya están listas"""
+    return dict(db.ready)
+
+async def _wait_for_database():
+    """Verificar la conexión, reintentando con espera exponencial"""
+    delay = 1
+    while True:
+        try:
+            await db.backend.warm_up()
+            db.ready["database"] = True
+            return
+        except Exception as e:
+            logger.warning("⚠️ Almacenamiento no disponible, reintentando en %ss: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+async def _build_indexes():
+    if settings.CREATE_INDEXES_ON_STARTUP:
+        await create_indexes()
+    else:
+        db.ready["indexes"] = True
+
+async def _load_leaderboard():
+    # El caché incluye el tablero de mejores por jugador: cargarlo
+    # después del backfill para no empezar con un tablero vacío
+    await backfill_best_scores()
+    await start_leaderboard_cache()
+    start_change_stream()
+
+async def warm_up():
+    """Conexión, índices y cachés; los índices se crean a la vez que se cargan los cachés"""
+    await _wait_for_database()
+    await asyncio.gather(_build_indexes(), _load_leaderboard(), start_rank_index(), _load_game_stats())
+    logger.info("✅ Almacenamiento listo")
+    start_compaction()
+
+def start_warm_up():
+    """Preparar el almacenamiento en segundo plano sin bloquear el arranque"""
+    db.warm_up_task = asyncio.create_task(warm_up())
+
+async def stop_warm_up():
+    if db.warm_up_task:
+        db.warm_up_task.cancel()
+        db.warm_up_task = None
+
+def _best_board(mode: str) -> str:
+    """Nombre del tablero de mejores puntuaciones por jugador en el caché"""
+    return f"{mode}_best"
+
+def _window_board(mode: str, window: str, bucket: int) -> str:
+    """Tablero del caché para un día o semana concretos"""
+    return f"{mode}_{window}_{bucket}"
+
+async def _update_derived(mode: str, documents: list):
+    """
+    Actualizar las mejores puntuaciones por jugador y la copia por ventanas.
+    El historial ya quedó guardado, así que un fallo aquí solo se registra
+    y no se propaga.
+    """
+    try:
+        await db.backend.update_best(mode, documents)
+    except Exception as e:
+        logger.warning("⚠️ Error actualizando mejores puntuaciones: %s", e)
     
     try:
-        database = await get_database()
-        
-        # Índices para leaderboard_normal
-        leaderboard_normal = database["leaderboard_normal"]
-        await leaderboard_normal.create_indexes([
-            IndexModel([("score", DESCENDING)], name="score_desc"),
-            IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
-            IndexModel([("player_name", 1), ("timestamp", DESCENDING)], name="player_recent")
-        ])
-        
-        # Índices para leaderboard_imposible
-        leaderboard_imposible = database["leaderboard_imposible"]
-        await leaderboard_imposible.create_indexes([
-            IndexModel([("score", DESCENDING)], name="score_desc"),
-            IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
-            IndexModel([("player_name", 1), ("timestamp", DESCENDING)], name="player_recent")
-        ])
-        
-        print("✅ Índices creados exitosamente")
-        
+        await db.backend.insert_recent(mode, documents)
     except Exception as e:
-        print(f"⚠️ Error creando índices: {e}")
+        logger.warning("⚠️ Error guardando puntuaciones recientes: %s", e)
+
+async def _insert_entries(mode: str, documents: list):
+    """Escritor de la cola: historial en lote y luego las colecciones derivadas"""
+    failures = await db.backend.insert_many(mode, documents)
+    saved = [document for index, document in enumerate(documents) if index not in failures]
+    if saved:
+        await _update_derived(mode, saved)
+    return failures
+
+async def backfill_best_scores():
+    """Construir las mejores puntuaciones por jugador desde el historial (una sola vez)"""
+    try:
+        for mode in settings.ALLOWED_GAME_MODES:
+            if await db.backend.backfill_best(mode):
+                logger.info("✅ Mejores puntuaciones de '%s' construidas desde el historial", mode)
+    except Exception as e:
+        logger.warning("⚠️ Error construyendo mejores puntuaciones: %s", e)
+
+def _apply_entry(mode: str, entry: dict):
+    """
+    Reflejar una entrada guardada en los tableros en memoria y avisar a los
+    suscriptores del stream si alguno cambió
+    """
+    if not settings.LEADERBOARD_CACHE_ENABLED:
+        leaderboard_events.publish(mode)
+        return
+    
+    if db.reloads:
+        db.reloaded_entries.append((mode, entry))
+    
+    # Actualizar el top-N en memoria solo si la entrada supera el corte
+    changed = leaderboard_cache.offer(mode, entry)
+    changed |= leaderboard_cache.offer_best(_best_board(mode), {**entry, "_id": entry["player_name"]})
+    for window, bucket in window_buckets(entry["timestamp"]).items():
+        changed |= leaderboard_cache.offer(_window_board(mode, window, bucket), entry)
+    
+    if changed:
+        response_cache.bump(mode)
+        leaderboard_events.publish(mode)
 
-async def save_leaderboard_entry(player_name: str, score: int, mode: str):
+async def save_leaderboard_entry(player_name: str, score: int, mode: str, idempotency_key: str = None):
     """
     Guardar entrada en el leaderboard con validaciones
+    
+    Con idempotency_key, si otra instancia ya guardó una entrada con esa
+    clave (índice único) se devuelve el _id de esa entrada sin escribir.
     """
     # Validaciones de seguridad
     if not player_name or len(player_name) > settings.MAX_PLAYER_NAME_LENGTH:
@@ -83,50 +221,555 @@ async def save_leaderboard_entry(player_name: str, score: int, mode: str):
     if mode not in settings.ALLOWED_GAME_MODES:
         raise ValueError("Modo de juego inválido")
     
-    database = await get_database()
-    collection_name = f"leaderboard_{mode}"
-    collection = database[collection_name]
-    
-    # Documento con timestamp UTC
+    # Documento con timestamp UTC; el _id se asigna aquí para poder
+    # devolverlo aunque la escritura se agrupe en un lote. MongoDB guarda
+    # milisegundos: truncar aquí hace que el caché y la base tengan la
+    # misma clave (score, timestamp, _id) y los cursores coincidan
+    now = datetime.utcnow()
     entry = {
+        "_id": ObjectId(),
         "player_name": player_name.upper().strip(),
         "score": int(score),
-        "timestamp": datetime.utcnow()
+        "timestamp": now.replace(microsecond=now.microsecond // 1000 * 1000)
     }
+    if idempotency_key is not None:
+        # Solo si viene: el índice único es sparse
+        entry["idempotency_key"] = idempotency_key
     
     try:
-        result = await collection.insert_one(entry)
-        return result.inserted_id
+        if db.write_buffer is not None and db.write_buffer.running:
+            await db.write_buffer.submit(mode, entry)
+        else:
+            await db.backend.insert(mode, entry)
+            await _update_derived(mode, [entry])
     except Exception as e:
-        print(f"Error guardando entrada: {e}")
+        if idempotency_key is not None and db.backend.is_duplicate(e):
+            existing = await db.backend.find_by_idempotency_key(mode, idempotency_key)
+            if existing is not None:
+                return existing["_id"]
+        logger.error("Error guardando entrada: %s", e)
         raise
+    
+    _apply_entry(mode, entry)
+    
+    # Histograma de posiciones; la resincronización periódica corrige
+    # cualquier diferencia con escrituras de otras instancias
+    rank_index.add(mode, entry["score"])
+    
+    return entry["_id"]
 
-async def get_leaderboard(mode: str, limit: int = 10):
+async def save_score_entry(
+    player_name: str,
+    score: int,
+    mode: str,
+    match_id: str = None,
+    idempotency_key: str = None
+):
+    """
+    Guardar una puntuación, o la de una partida terminada del servidor
+    (común a POST /leaderboard y al WebSocket)
+    Returns: (id de la entrada, puntuación guardada)
+    Raises: MatchError si la partida no existe o no se puede guardar
+    """
+    match = None
+    if match_id is not None:
+        # Se retira antes de guardar para que no se guarde dos veces
+        match = match_store.take_finished(match_id, mode)
+        score = match.score()
+    
+    try:
+        result = await save_leaderboard_entry(
+            player_name=player_name,
+            score=score,
+            mode=mode,
+            idempotency_key=idempotency_key
+        )
+    except Exception:
+        # Devolver la partida para que el cliente pueda reintentar
+        if match is not None:
+            match_store.set(match_id, match)
+        raise
+    
+    return result, score
+
+async def get_leaderboard(mode: str, limit: int = 10, unique: bool = False, window: str = None):
     """
     Obtener top jugadores del leaderboard con límite
+    
+    Con unique=True se lee la colección de mejores puntuaciones, con una
+    sola entrada por jugador. Con window="day" o "week" solo cuentan las
+    puntuaciones del día o la semana actuales (UTC).
     """
     # Validación de modo
     if mode not in settings.ALLOWED_GAME_MODES:
         raise ValueError("Modo de juego inválido")
     
+    if window is not None and window not in WINDOWS:
+        raise ValueError("Ventana inválida")
+    
     # Validar y limitar el límite
     if limit < 1 or limit > 100:
         limit = 10
     
-    database = await get_database()
-    collection_name = f"leaderboard_{mode}"
-    collection = database[collection_name]
+    if window is not None:
+        return await _get_window_leaderboard(mode, window, limit)
+    
+    # Servir desde el top-N en memoria cuando está disponible
+    if settings.LEADERBOARD_CACHE_ENABLED:
+        cached = leaderboard_cache.top(_best_board(mode) if unique else mode, limit)
+        if cached is not None:
+            return cached
     
     try:
-        # Usar índice para ordenar por score descendente
-        cursor = collection.find(
-            {},
-            {"_id": 0, "player_name": 1, "score": 1, "timestamp": 1}
-        ).sort("score", DESCENDING).limit(limit)
+        if unique:
+            entries = await db.backend.find_top_best(mode, limit)
+        else:
+            entries = await db.backend.find_top(mode, limit)
+        return [
+            {
+                "player_name": e["player_name"],
+                "score": e["score"],
+                "timestamp": e["timestamp"]
+            }
+            for e in entries
+        ]
         
-        entries = await cursor.to_list(length=limit)
-        return entries
+    except Exception as e:
+        logger.error("Error obteniendo leaderboard: %s", e)
+        raise
+
+async def get_leaderboard_json(mode: str, limit: int = 10, unique: bool = False, window: str = None):
+    """
+    Leaderboard codificado en JSON junto con su ETag
+    Returns: (cuerpo, etag)
+    
+    Con el caché activo los bytes se reutilizan hasta que cambia la versión
+    del modo, sin volver a validar ni serializar las entradas.
+    """
+    if not settings.LEADERBOARD_CACHE_ENABLED:
+        body = _encode_leaderboard(await get_leaderboard(mode, limit, unique, window))
+        return body, ResponseCache.etag_for(body)
+    
+    # La ventana actual forma parte de la clave: al cambiar de día la
+    # entrada anterior deja de usarse aunque nadie haya guardado
+    bucket = window_buckets(datetime.utcnow())[window] if window in WINDOWS else None
+    key = (mode, limit, unique, window, bucket)
+    
+    cached = response_cache.get(key, mode)
+    if cached is not None:
+        return cached
+    
+    version = response_cache.version(mode)
+    entries = await get_leaderboard(mode, limit, unique, window)
+    return response_cache.put(key, version, _encode_leaderboard(entries))
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _cursor_key(entry: dict) -> tuple:
+    """Clave de orden del leaderboard, igual a la del caché"""
+    return (entry["score"], entry["timestamp"], str(entry["_id"]))
+
+def encode_cursor(key: tuple) -> str:
+    """Cursor opaco (base64 URL) para la clave (score, timestamp, _id)"""
+    score, timestamp, entry_id = key
+    micros = (timestamp - _EPOCH) // timedelta(microseconds=1)
+    raw = f"{score}:{micros}:{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """Clave (score, timestamp, _id) de un cursor; ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, micros, entry_id = raw.split(":")
+        key = (int(score), _EPOCH + timedelta(microseconds=int(micros)), entry_id)
+    except (ValueError, OverflowError):
+        raise ValueError("Cursor inválido")
+    
+    if not ObjectId.is_valid(entry_id) or str(ObjectId(entry_id)) != entry_id:
+        raise ValueError("Cursor inválido")
+    return key
+
+async def _get_first_page_json(mode: str, limit: int) -> Tuple[bytes, str, Optional[str]]:
+    """
+    Top de `limit` entradas y el cursor de la página siguiente, con una
+    sola lectura: del caché si puede responder, si no de la misma consulta
+    """
+    if (
+        settings.LEADERBOARD_CACHE_ENABLED
+        and leaderboard_cache.is_loaded(mode)
+        and limit <= leaderboard_cache.size
+    ):
+        body, etag = await get_leaderboard_json(mode, limit)
+        # None: el caché tiene todo el tablero y no llega a `limit` entradas
+        key = leaderboard_cache.key_at(mode, limit)
+        return body, etag, encode_cursor(key) if key is not None else None
+    
+    try:
+        entries = await db.backend.find_top(mode, limit)
+    except Exception as e:
+        logger.error("Error obteniendo leaderboard: %s", e)
+        raise
+    
+    body = _encode_leaderboard([
+        {
+            "player_name": e["player_name"],
+            "score": e["score"],
+            "timestamp": e["timestamp"]
+        }
+        for e in entries
+    ])
+    next_cursor = encode_cursor(_cursor_key(entries[-1])) if len(entries) == limit else None
+    return body, ResponseCache.etag_for(body), next_cursor
+
+async def _get_leaderboard_page(mode: str, after: tuple, limit: int) -> Tuple[List[dict], Optional[tuple]]:
+    """Entradas por debajo de `after` y la clave de la última"""
+    # Las primeras páginas salen del top-N en memoria; las más profundas,
+    # de una búsqueda por rango en el índice (mismo costo a cualquier profundidad)
+    if settings.LEADERBOARD_CACHE_ENABLED:
+        page = leaderboard_cache.page(mode, after, limit)
+        if page is not None:
+            entries, keys = page
+            return entries, keys[-1] if keys else None
+    
+    try:
+        entries = await db.backend.find_page(mode, after, limit)
+    except Exception as e:
+        logger.error("Error obteniendo página del leaderboard: %s", e)
+        raise
+    
+    return [
+        {
+            "player_name": e["player_name"],
+            "score": e["score"],
+            "timestamp": e["timestamp"]
+        }
+        for e in entries
+    ], _cursor_key(entries[-1]) if entries else None
+
+async def get_leaderboard_page_json(mode: str, limit: int = 10, after: str = None):
+    """
+    Página del leaderboard histórico con paginación por cursor (keyset
+    sobre score, timestamp y _id descendentes)
+    Returns: (cuerpo, etag, cursor de la página siguiente o None)
+    
+    Sin cursor es el top de siempre (con su caché de respuestas).
+    """
+    if mode not in settings.ALLOWED_GAME_MODES:
+        raise ValueError("Modo de juego inválido")
+    
+    if limit < 1 or limit > 100:
+        raise ValueError("Límite inválido")
+    
+    if after is None:
+        return await _get_first_page_json(mode, limit)
+    
+    entries, last_key = await _get_leaderboard_page(mode, decode_cursor(after), limit)
+    body = _encode_leaderboard(entries)
+    next_cursor = encode_cursor(last_key) if len(entries) == limit else None
+    return body, ResponseCache.etag_for(body), next_cursor
+
+def _begin_reload():
+    db.reloads += 1
+
+def _end_reload():
+    """Volver a aplicar lo guardado durante las recargas cuando termina la última"""
+    db.reloads -= 1
+    if db.reloads == 0:
+        entries, db.reloaded_entries = db.reloaded_entries, []
+        for mode, entry in entries:
+            _apply_entry(mode, entry)
+
+async def _load_window_board(mode: str, window: str, bucket: int) -> str:
+    """Cargar el top-N de la ventana actual y descartar el de la anterior"""
+    board = _window_board(mode, window, bucket)
+    _begin_reload()
+    try:
+        # Del primario: una réplica atrasada dejaría fuera puntuaciones recientes
+        entries = await db.backend.find_top_window(
+            mode, window, bucket, settings.LEADERBOARD_CACHE_SIZE, primary=True
+        )
+        leaderboard_cache.load(board, entries)
+    finally:
+        _end_reload()
+    response_cache.bump(mode)
+    leaderboard_events.publish(mode)
+    
+    previous = db.window_boards.get((mode, window))
+    if previous is not None and previous != board:
+        leaderboard_cache.discard(previous)
+    db.window_boards[(mode, window)] = board
+    return board
+
+async def _get_window_leaderboard(mode: str, window: str, limit: int):
+    bucket = window_buckets(datetime.utcnow())[window]
+    
+    try:
+        if settings.LEADERBOARD_CACHE_ENABLED:
+            board = _window_board(mode, window, bucket)
+            # Al cambiar de día o semana el tablero nuevo se carga una sola vez
+            if not leaderboard_cache.is_loaded(board):
+                await _load_window_board(mode, window, bucket)
+            cached = leaderboard_cache.top(board, limit)
+            if cached is not None:
+                return cached
         
+        entries = await db.backend.find_top_window(mode, window, bucket, limit)
+        return [
+            {
+                "player_name": e["player_name"],
+                "score": e["score"],
+                "timestamp": e["timestamp"]
+            }
+            for e in entries
+        ]
+    
+    except Exception as e:
+        logger.error("Error obteniendo leaderboard por ventana: %s", e)
+        raise
+
+async def get_rank(mode: str, score: int):
+    """
+    Posición de una puntuación en el leaderboard de un modo
+    Returns: {"rank", "total", "percentile"}
+    """
+    if mode not in settings.ALLOWED_GAME_MODES:
+        raise ValueError("Modo de juego inválido")
+    
+    position = rank_index.rank(mode, score)
+    if position is not None:
+        return position
+    
+    # Sin histograma cargado: construirlo con una sola agregación
+    histogram = await db.backend.score_histogram(mode)
+    if settings.RANK_INDEX_ENABLED:
+        rank_index.load(mode, histogram)
+        return rank_index.rank(mode, score)
+    
+    scratch = RankIndex()
+    scratch.load(mode, histogram)
+    return scratch.rank(mode, score)
+
+async def refresh_leaderboard_cache():
+    """Recargar el top-N en memoria de cada modo desde el almacenamiento"""
+    size = settings.LEADERBOARD_CACHE_SIZE
+    
+    # Del primario, y reaplicando lo guardado mientras la consulta estaba en
+    # curso: load() reemplaza el tablero completo
+    _begin_reload()
+    try:
+        for mode in settings.ALLOWED_GAME_MODES:
+            entries = await db.backend.find_top(mode, size, primary=True)
+            leaderboard_cache.load(mode, entries)
+            
+            entries = await db.backend.find_top_best(mode, size, primary=True)
+            leaderboard_cache.load(_best_board(mode), entries)
+            response_cache.bump(mode)
+            leaderboard_events.publish(mode)
+            
+            buckets = window_buckets(datetime.utcnow())
+            for window in WINDOWS:
+                await _load_window_board(mode, window, buckets[window])
+    finally:
+        _end_reload()
+    
+    db.ready["leaderboard_cache"] = True
+
+async def _leaderboard_cache_loop():
+    """Resincronizar periódicamente el caché (cubre escrituras de otras instancias)"""
+    while True:
+        await asyncio.sleep(settings.LEADERBOARD_CACHE_REFRESH_SECONDS)
+        try:
+            await refresh_leaderboard_cache()
+        except Exception as e:
+            logger.warning("⚠️ Error resincronizando caché del leaderboard: %s", e)
+
+async def start_leaderboard_cache():
+    """Cargar el caché al iniciar y programar su resincronización"""
+    if not settings.LEADERBOARD_CACHE_ENABLED:
+        db.ready["leaderboard_cache"] = True
+        return
+    
+    try:
+        await refresh_leaderboard_cache()
+        logger.info("✅ Caché del leaderboard cargado")
+    except Exception as e:
+        logger.warning("⚠️ Error cargando caché del leaderboard: %s", e)
+    
+    if settings.LEADERBOARD_CACHE_REFRESH_SECONDS > 0:
+        db.cache_task = asyncio.create_task(_leaderboard_cache_loop())
+
+async def stop_leaderboard_cache():
+    """Detener la resincronización y vaciar el caché"""
+    if db.cache_task:
+        db.cache_task.cancel()
+        db.cache_task = None
+    leaderboard_cache.clear()
+    response_cache.clear()
+    db.window_boards.clear()
+    db.ready["leaderboard_cache"] = False
+
+async def refresh_rank_index():
+    """Reconstruir el histograma de puntuaciones de cada modo"""
+    for mode in settings.ALLOWED_GAME_MODES:
+        rank_index.load(mode, await db.backend.score_histogram(mode, primary=True))
+    db.ready["rank_index"] = True
+
+async def _rank_index_loop():
+    """Resincronizar periódicamente el histograma (cubre escrituras de otras instancias)"""
+    while True:
+        await asyncio.sleep(settings.RANK_INDEX_REFRESH_SECONDS)
+        try:
+            await refresh_rank_index()
+        except Exception as e:
+            logger.warning("⚠️ Error resincronizando índice de posiciones: %s", e)
+
+async def start_rank_index():
+    """Cargar el histograma al iniciar y programar su resincronización"""
+    if not settings.RANK_INDEX_ENABLED:
+        db.ready["rank_index"] = True
+        return
+    
+    try:
+        await refresh_rank_index()
+        logger.info("✅ Índice de posiciones cargado")
+    except Exception as e:
+        logger.warning("⚠️ Error cargando índice de posiciones: %s", e)
+    
+    if settings.RANK_INDEX_REFRESH_SECONDS > 0:
+        db.rank_task = asyncio.create_task(_rank_index_loop())
+
+async def stop_rank_index():
+    """Detener la resincronización y vaciar el histograma"""
+    if db.rank_task:
+        db.rank_task.cancel()
+        db.rank_task = None
+    rank_index.clear()
+    db.ready["rank_index"] = False
+
+async def _change_stream_loop():
+    """Aplicar a los tableros en memoria las puntuaciones de otras instancias"""
+    delay = 1
+    while True:
+        try:
+            async for mode, entry in db.backend.watch_entries():
+                # Las propias también llegan; offer() ignora las repetidas
+                _apply_entry(mode, entry)
+                delay = 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("⚠️ Change stream interrumpido, reintentando en %ss: %s", delay, e)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
+
+def start_change_stream():
+    """Escuchar inserciones de otras instancias (solo MongoDB)"""
+    if not settings.LEADERBOARD_CHANGE_STREAM_ENABLED:
+        return
+    
+    if not db.backend.supports_watch:
+        logger.warning("⚠️ El almacenamiento '%s' no admite change streams", db.backend.name)
+        return
+    
+    db.change_stream_task = asyncio.create_task(_change_stream_loop())
+    logger.info("📡 Escuchando cambios del leaderboard de otras instancias")
+
+async def stop_change_stream():
+    if db.change_stream_task:
+        db.change_stream_task.cancel()
+        db.change_stream_task = None
+
+async def start_write_buffer():
+    """Iniciar la cola de escrituras agrupadas del leaderboard"""
+    if not settings.WRITE_BUFFER_ENABLED:
+        return
+    
+    db.write_buffer = LeaderboardWriteBuffer(
+        writer=_insert_entries,
+        batch_size=settings.WRITE_BUFFER_BATCH_SIZE,
+        flush_interval=settings.WRITE_BUFFER_FLUSH_INTERVAL_MS / 1000,
+        max_queue=settings.WRITE_BUFFER_MAX_QUEUE,
+        put_timeout=settings.WRITE_BUFFER_PUT_TIMEOUT_MS / 1000,
+    )
+    db.write_buffer.start()
+
+async def stop_write_buffer():
+    """Vaciar la cola de escrituras antes de cerrar la conexión"""
+    if db.write_buffer is not None:
+        logger.info("💾 Escribiendo puntuaciones pendientes...")
+        await db.write_buffer.stop()
+        db.write_buffer = None
+
+async def flush_game_stats():
+    """Sumar a la base los contadores de juego pendientes y leer los totales"""
+    deltas = game_stats.take_deltas()
+    if deltas:
+        try:
+            await db.backend.increment_stats(
+                {mode: GameStats.fields(counters) for mode, counters in deltas.items()}
+            )
+        except Exception:
+            # Se reintentan en el siguiente envío
+            game_stats.restore(deltas)
+            raise
+    # Del primario: los deltas ya no están en memoria y una réplica atrasada
+    # devolvería totales sin ellos
+    game_stats.load(await db.backend.get_stats(primary=True))
+
+async def _load_game_stats():
+    if not settings.GAME_STATS_ENABLED:
+        return
+    try:
+        await flush_game_stats()
     except Exception as e:
-        print(f"Error obteniendo leaderboard: {e}")
-        raise
\ No newline at end of file
+        logger.warning("⚠️ Error cargando estadísticas de juego: %s", e)
+
+async def _game_stats_loop():
+    """Enviar periódicamente los contadores (un $inc en lote por envío)"""
+    while True:
+        await asyncio.sleep(settings.GAME_STATS_FLUSH_SECONDS)
+        try:
+            await flush_game_stats()
+        except Exception as e:
+            logger.warning("⚠️ Error guardando estadísticas de juego: %s", e)
+
+def start_game_stats():
+    """Programar el envío de las estadísticas de juego"""
+    if settings.GAME_STATS_ENABLED and settings.GAME_STATS_FLUSH_SECONDS > 0:
+        db.game_stats_task = asyncio.create_task(_game_stats_loop())
+
+async def stop_game_stats():
+    """Detener el envío periódico y guardar lo pendiente antes de cerrar la conexión"""
+    if db.game_stats_task:
+        db.game_stats_task.cancel()
+        db.game_stats_task = None
+    if settings.GAME_STATS_ENABLED and db.backend is not None:
+        try:
+            await flush_game_stats()
+        except Exception as e:
+            logger.warning("⚠️ Error guardando estadísticas de juego: %s", e)
+    game_stats.clear()
+
+async def _compaction_loop():
+    """Compactar el historial al iniciar y luego cada COMPACTION_INTERVAL_SECONDS"""
+    while True:
+        try:
+            await compact(db.backend)
+        except Exception as e:
+            logger.warning("⚠️ Error compactando el historial: %s", e)
+        await asyncio.sleep(settings.COMPACTION_INTERVAL_SECONDS)
+
+def start_compaction():
+    """
+    Programar la compactación del historial
+    
+    Con varias instancias cada una la ejecuta por su cuenta: mover al
+    archivo se puede repetir, así que a lo sumo se duplica el trabajo.
+    """
+    if settings.COMPACTION_ENABLED and db.compaction_task is None:
+        db.compaction_task = asyncio.create_task(_compaction_loop())
+
+async def stop_compaction():
+    if db.compaction_task:
+        db.compaction_task.cancel()
+        db.compaction_task = None
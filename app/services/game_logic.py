@@ -1,5 +1,106 @@
 import random
 
+# Tablas de consulta para la evaluación por lotes (el índice es el movimiento 1-3).
+# NumPy solo se importa la primera vez que se usa una versión por lotes, para
+# no alargar el arranque de la aplicación.
+_batch = None
+
+def _batch_tables() -> dict:
+    global _batch
+    if _batch is None:
+        import numpy as np
+        
+        _batch = {
+            "np": np,
+            "labels": np.array(["tie", "player", "cpu"]),
+            "outcomes": np.array([
+                [0, 0, 0, 0],
+                [0, 0, 2, 1],  # Piedra vs Piedra, Papel, Tijera
+                [0, 1, 0, 2],  # Papel vs Piedra, Papel, Tijera
+                [0, 2, 1, 0],  # Tijera vs Piedra, Papel, Tijera
+            ], dtype=np.int8),
+            "winning_counter": np.array([0, 2, 3, 1], dtype=np.int8),
+            "rng": np.random.default_rng(),
+        }
+    return _batch
+
+ADAPTIVE_MODE = "adaptativo"
+
+# Movimiento que le gana a cada uno (índice = movimiento 1-3)
+_COUNTER = (0, 2, 3, 1)
+
+
+class AdaptivePredictor:
+    """
+    Predice la próxima jugada del jugador con un modelo de Markov de orden k
+    sobre sus últimas k jugadas, con las frecuencias globales como respaldo.
+
+    Todo el estado es un bytearray de (3^k + 1) * 3 contadores (30 bytes con
+    k=2) y el contexto actual; actualizar y predecir cuestan O(1). Al llegar
+    a 255 un contador se divide a la mitad la fila, así el modelo también
+    se adapta a cambios de estrategia.
+    """
+
+    __slots__ = ("order", "counts", "context", "seen")
+
+    def __init__(self, order: int = 2):
+        self.order = order
+        # Filas: una por contexto (últimas k jugadas) + la fila de frecuencias
+        self.counts = bytearray((3 ** order + 1) * 3)
+        self.context = 0
+        self.seen = 0
+
+    def _row(self) -> int:
+        """Inicio de la fila a usar: el contexto si tiene datos, si no las frecuencias"""
+        counts = self.counts
+        if self.seen >= self.order:
+            row = self.context * 3
+            if counts[row] or counts[row + 1] or counts[row + 2]:
+                return row
+        return len(counts) - 3
+
+    def predict(self) -> int:
+        """Jugada más probable del jugador (1-3), o 0 si aún no hay datos"""
+        counts = self.counts
+        row = self._row()
+        rock, paper, scissors = counts[row], counts[row + 1], counts[row + 2]
+        best = max(rock, paper, scissors)
+        if best == 0:
+            return 0
+        if rock == best and paper != best and scissors != best:
+            return 1
+        if paper == best and rock != best and scissors != best:
+            return 2
+        if scissors == best and rock != best and paper != best:
+            return 3
+        # Empate entre las más probables: elegir una al azar
+        return random.choice([move + 1 for move in range(3) if counts[row + move] == best])
+
+    def cpu_move(self) -> int:
+        """Jugada de la CPU: la que le gana a la predicción (aleatoria sin datos)"""
+        predicted = self.predict()
+        return _COUNTER[predicted] if predicted else random.randint(1, 3)
+
+    def _bump(self, index: int):
+        counts = self.counts
+        if counts[index] == 255:
+            row = index - index % 3
+            for i in range(row, row + 3):
+                counts[i] >>= 1
+        counts[index] += 1
+
+    def update(self, player_move: int):
+        """Registrar la jugada real del jugador (después de que la CPU eligió)"""
+        move = player_move - 1
+        if self.seen >= self.order:
+            self._bump(self.context * 3 + move)
+        self._bump(len(self.counts) - 3 + move)
+
+        self.context = (self.context * 3 + move) % (3 ** self.order)
+        if self.seen < self.order:
+            self.seen += 1
+
+
 class GameLogic:
     """Lógica del juego Piedra, Papel o Tijera"""
     
@@ -50,7 +151,83 @@ class GameLogic:
             }
             return winning_counter[player_move]
     
+    @staticmethod
+    def get_cpu_move_adaptativo(predictor: AdaptivePredictor, player_move: int) -> int:
+        """
+        Modo Adaptativo: la CPU elige a partir del historial del jugador, sin
+        mirar la jugada actual, que solo se usa después para aprender
+        """
+        cpu_move = predictor.cpu_move()
+        predictor.update(player_move)
+        return cpu_move
+    
+    @staticmethod
+    def play(mode: str, player_move: int, predictor: AdaptivePredictor = None) -> tuple:
+        """
+        Jugar una ronda completa en el modo indicado
+        
+        predictor: estado del jugador en el modo adaptativo (sin él la CPU
+        no tiene historial y juega al azar)
+        Returns: (cpu_move, result)
+        """
+        if mode == "normal":
+            cpu_move = GameLogic.get_cpu_move_normal()
+        elif mode == ADAPTIVE_MODE:
+            cpu_move = GameLogic.get_cpu_move_adaptativo(predictor or AdaptivePredictor(), player_move)
+        else:  # imposible
+            cpu_move = GameLogic.get_cpu_move_imposible(player_move)
+        
+        return cpu_move, GameLogic.evaluate_round(player_move, cpu_move)
+    
     @staticmethod
     def calculate_score(player_wins: int, cpu_wins: int, ties: int) -> int:
         """Calcula el puntaje final"""
-        return (player_wins * 100) - (cpu_wins * 100) + (ties * 25)
\ No newline at end of file
+        return (player_wins * 100) - (cpu_wins * 100) + (ties * 25)
+    
+    # ===================================
+    # Versiones por lotes (arrays de NumPy)
+    # ===================================
+    
+    @staticmethod
+    def as_moves(moves: list):
+        """Convertir una lista de movimientos al array que usan los lotes"""
+        tables = _batch_tables()
+        return tables["np"].asarray(moves, dtype=tables["np"].int8)
+    
+    @staticmethod
+    def evaluate_rounds(player_moves, cpu_moves):
+        """
+        Evalúa varias rondas a la vez
+        Returns: array de códigos (0=tie, 1=player, 2=cpu), ver result_labels
+        """
+        return _batch_tables()["outcomes"][player_moves, cpu_moves]
+    
+    @staticmethod
+    def result_labels(results) -> list:
+        """Códigos de evaluate_rounds -> ['tie' | 'player' | 'cpu', ...]"""
+        return _batch_tables()["labels"][results].tolist()
+    
+    @staticmethod
+    def get_cpu_moves_normal(count: int):
+        """Modo Normal por lotes: jugadas aleatorias"""
+        tables = _batch_tables()
+        return tables["rng"].integers(1, 4, size=count, dtype=tables["np"].int8)
+    
+    @staticmethod
+    def get_cpu_moves_adaptativo(player_moves, predictor: AdaptivePredictor):
+        """Modo Adaptativo por lotes: cada ronda aprende de las anteriores, en orden"""
+        cpu_moves = [
+            GameLogic.get_cpu_move_adaptativo(predictor, player_move)
+            for player_move in player_moves.tolist()
+        ]
+        return GameLogic.as_moves(cpu_moves)
+    
+    @staticmethod
+    def get_cpu_moves_imposible(player_moves):
+        """Modo Imposible por lotes: misma distribución que get_cpu_move_imposible"""
+        tables = _batch_tables()
+        np, rng = tables["np"], tables["rng"]
+        count = len(player_moves)
+        chance = rng.integers(0, 101, size=count)
+        random_moves = rng.integers(1, 4, size=count, dtype=np.int8)
+        return np.where(chance < 20, random_moves, tables["winning_counter"][player_moves])
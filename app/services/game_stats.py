@@ -0,0 +1,101 @@
+from typing import Dict, List
+
+# Mismo orden que los códigos de GameLogic.evaluate_rounds
+RESULTS = ("tie", "player", "cpu")
+# Índice = movimiento - 1
+MOVES = ("piedra", "papel", "tijera")
+
+# Contadores por modo, en este orden; en la base se guardan con estos nombres
+FIELDS = (
+    tuple(f"results.{result}" for result in RESULTS)
+    + tuple(f"player_moves.{move}" for move in MOVES)
+    + tuple(f"cpu_moves.{move}" for move in MOVES)
+)
+_RESULT_INDEX = {result: index for index, result in enumerate(RESULTS)}
+
+
+class GameStats:
+    """
+    Estadísticas globales de juego por modo.
+
+    record() solo incrementa tres posiciones de una lista del proceso, sin
+    I/O. Una tarea en segundo plano retira los deltas (take_deltas), los
+    suma en la base con una sola escritura en lote y carga el total de
+    todas las instancias (load); las lecturas combinan ese total con lo
+    que este proceso aún no envió.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._pending: Dict[str, List[int]] = {}
+        # Totales de la base en la última lectura
+        self._totals: Dict[str, List[int]] = {}
+
+    def _counters(self, mode: str) -> List[int]:
+        counters = self._pending.get(mode)
+        if counters is None:
+            counters = self._pending[mode] = [0] * len(FIELDS)
+        return counters
+
+    def record(self, mode: str, player_move: int, cpu_move: int, result: str):
+        if not self.enabled:
+            return
+        counters = self._counters(mode)
+        counters[_RESULT_INDEX[result]] += 1
+        counters[2 + player_move] += 1
+        counters[5 + cpu_move] += 1
+
+    def record_batch(self, mode: str, player_moves, cpu_moves, results):
+        """Versión por lotes: arrays de NumPy de GameLogic (códigos de resultado)"""
+        if not self.enabled:
+            return
+        import numpy as np
+
+        counters = self._counters(mode)
+        for offset, values, size in ((0, results, 3), (2, player_moves, 4), (5, cpu_moves, 4)):
+            for index, count in enumerate(np.bincount(values, minlength=size).tolist()):
+                if count:
+                    counters[offset + index] += count
+
+    def take_deltas(self) -> Dict[str, List[int]]:
+        """Retirar lo acumulado desde la última vez (para enviarlo a la base)"""
+        pending, self._pending = self._pending, {}
+        return {mode: counters for mode, counters in pending.items() if any(counters)}
+
+    def restore(self, deltas: Dict[str, List[int]]):
+        """Devolver deltas que no se pudieron escribir; se reintentan en el siguiente envío"""
+        for mode, delta in deltas.items():
+            counters = self._counters(mode)
+            for index, value in enumerate(delta):
+                counters[index] += value
+
+    def load(self, totals: Dict[str, Dict[str, int]]):
+        """Reemplazar los totales con los leídos de la base ({modo: {campo: valor}})"""
+        self._totals = {
+            mode: [fields.get(field, 0) for field in FIELDS]
+            for mode, fields in totals.items()
+        }
+
+    @staticmethod
+    def fields(counters: List[int]) -> Dict[str, int]:
+        """{campo: valor} de los contadores distintos de cero"""
+        return {field: value for field, value in zip(FIELDS, counters) if value}
+
+    def snapshot(self, modes: List[str]) -> Dict[str, dict]:
+        """Totales de la base más lo pendiente de este proceso, por modo"""
+        snapshot = {}
+        for mode in modes:
+            totals = self._totals.get(mode, [0] * len(FIELDS))
+            pending = self._pending.get(mode, [0] * len(FIELDS))
+            counters = [total + delta for total, delta in zip(totals, pending)]
+            snapshot[mode] = {
+                "rounds": sum(counters[:3]),
+                "results": dict(zip(RESULTS, counters[:3])),
+                "player_moves": dict(zip(MOVES, counters[3:6])),
+                "cpu_moves": dict(zip(MOVES, counters[6:9])),
+            }
+        return snapshot
+
+    def clear(self):
+        self._pending.clear()
+        self._totals.clear()
@@ -0,0 +1,129 @@
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+
+class LeaderboardCache:
+    """
+    Top-N materializado en memoria por tablero (modo de juego,
+    "<modo>_best" para las mejores puntuaciones por jugador o
+    "<modo>_<ventana>_<n>" para un día o semana).
+
+    Se carga una vez desde la base de datos y se mantiene de forma
+    incremental con cada puntuación guardada, de modo que las lecturas del
+    leaderboard no necesitan ir a MongoDB.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # Claves (score, timestamp, id) ordenadas de forma ascendente;
+        # _docs mantiene el mismo orden con los documentos públicos
+        self._keys: Dict[str, list] = {}
+        self._docs: Dict[str, list] = {}
+
+    @staticmethod
+    def _key(entry: dict) -> tuple:
+        return (entry["score"], entry["timestamp"], str(entry.get("_id", "")))
+
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        return {
+            "player_name": entry["player_name"],
+            "score": entry["score"],
+            "timestamp": entry["timestamp"],
+        }
+
+    def is_loaded(self, mode: str) -> bool:
+        return mode in self._keys
+
+    def load(self, mode: str, entries: List[dict]):
+        """Reemplazar el contenido de un modo con las entradas de la base de datos"""
+        ordered = sorted(entries, key=self._key)[-self.size:]
+        self._keys[mode] = [self._key(e) for e in ordered]
+        self._docs[mode] = [self._public(e) for e in ordered]
+
+    def offer(self, mode: str, entry: dict) -> bool:
+        """
+        Insertar una entrada si supera el corte actual del top-N
+        Returns: True si la entrada quedó dentro del top-N
+        """
+        keys = self._keys.get(mode)
+        if keys is None:
+            return False
+
+        key = self._key(entry)
+        if len(keys) >= self.size and key <= keys[0]:
+            return False
+
+        index = bisect.bisect(keys, key)
+        if index and keys[index - 1] == key:
+            # Ya estaba (p. ej. llega otra vez por el change stream)
+            return False
+        keys.insert(index, key)
+        self._docs[mode].insert(index, self._public(entry))
+
+        if len(keys) > self.size:
+            del keys[0]
+            del self._docs[mode][0]
+        return True
+
+    def offer_best(self, mode: str, entry: dict) -> bool:
+        """
+        Como offer(), pero con una sola entrada por _id (jugador): reemplaza
+        la anterior solo si la nueva es mejor
+        """
+        keys = self._keys.get(mode)
+        if keys is None:
+            return False
+
+        key = self._key(entry)
+        for index, existing in enumerate(keys):
+            if existing[2] == key[2]:
+                if existing >= key:
+                    return False
+                del keys[index]
+                del self._docs[mode][index]
+                break
+
+        return self.offer(mode, entry)
+
+    def top(self, mode: str, limit: int) -> Optional[List[dict]]:
+        """Top de un modo, o None si el caché no puede responder la consulta"""
+        docs = self._docs.get(mode)
+        if docs is None or limit > self.size:
+            return None
+        return docs[:-limit - 1:-1]
+
+    def key_at(self, mode: str, position: int) -> Optional[tuple]:
+        """Clave (score, timestamp, id) de la posición indicada (1 = primero)"""
+        keys = self._keys.get(mode)
+        if keys is None or position < 1 or position > len(keys):
+            return None
+        return keys[-position]
+
+    def page(self, mode: str, after: tuple, limit: int) -> Optional[Tuple[List[dict], List[tuple]]]:
+        """
+        Hasta `limit` entradas por debajo de la clave `after`, de mayor a
+        menor, junto con sus claves; None si la página puede seguir más
+        allá de lo que guarda el caché
+        """
+        keys = self._keys.get(mode)
+        if keys is None:
+            return None
+
+        end = bisect.bisect_left(keys, after)
+        start = end - limit
+        if start < 0:
+            if len(keys) >= self.size:
+                # Hay entradas por debajo del corte que el caché no tiene
+                return None
+            start = 0
+        return self._docs[mode][start:end][::-1], keys[start:end][::-1]
+
+    def discard(self, mode: str):
+        """Olvidar un tablero (p. ej. el de un día que ya terminó)"""
+        self._keys.pop(mode, None)
+        self._docs.pop(mode, None)
+
+    def clear(self):
+        self._keys.clear()
+        self._docs.clear()
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Dict
+
+
+class LeaderboardEvents:
+    """
+    Pub/sub en proceso de cambios del leaderboard, por modo.
+
+    No hay una cola por suscriptor: cada modo tiene un asyncio.Event
+    compartido que publish() dispara y reemplaza, así que publicar cuesta
+    lo mismo con 10 que con 10.000 suscriptores. Al despertar, cada
+    suscriptor lee el estado más reciente; uno lento simplemente se salta
+    los intermedios (coalescencia) y nunca acumula memoria.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self.subscribers = 0
+        self.closed = False
+
+    def current(self, mode: str) -> asyncio.Event:
+        """
+        Evento que se disparará con el próximo cambio del modo.
+        Tomarlo ANTES de leer el estado evita perder un cambio intermedio.
+        """
+        event = self._events.get(mode)
+        if event is None:
+            event = self._events[mode] = asyncio.Event()
+        return event
+
+    def publish(self, mode: str):
+        event = self._events.pop(mode, None)
+        if event is not None:
+            event.set()
+
+    @staticmethod
+    async def wait(event: asyncio.Event, timeout: float) -> bool:
+        """True si hubo un cambio, False si se agotó el tiempo (heartbeat)"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def subscribe(self):
+        self.subscribers += 1
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+
+    def close(self):
+        """Despertar a todos los suscriptores para que terminen (al apagar)"""
+        self.closed = True
+        for mode in list(self._events):
+            self.publish(mode)
+
+    def reopen(self):
+        self.closed = False
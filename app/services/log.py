@@ -0,0 +1,157 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+from app.config import settings
+
+# Id de la solicitud en curso (lo fija RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord; el resto viene de extra= y va al JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de extra= incluidos"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar como máximo `burst` advertencias o errores iguales (mismo
+    logger y misma plantilla) por ventana; el primero de la ventana
+    siguiente lleva en `suppressed` cuántos se omitieron.
+    """
+
+    def __init__(self, burst: int, window_seconds: float, max_keys: int = 1024):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.suppressed_total = 0
+        # (logger, plantilla) -> [inicio de la ventana, emitidos, omitidos]
+        self._windows: Dict[tuple, List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+
+        if window is None or now - window[0] >= self.window_seconds:
+            if window is None and len(self._windows) >= self.max_keys:
+                self._windows.clear()
+            if window is not None and window[2]:
+                record.suppressed = window[2]
+            self._windows[key] = [now, 1, 0]
+            return True
+
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        self.suppressed_total += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Encola el registro sin formatearlo (eso lo hace el hilo del listener)
+    y lo descarta si la cola está llena, en lugar de bloquear el event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El contexto de la solicitud solo existe en el hilo que registra
+        if not hasattr(record, "request_id"):
+            request_id = request_id_var.get()
+            if request_id is not None:
+                record.request_id = request_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Logging:
+    handler: Optional[DroppingQueueHandler] = None
+    sampler: Optional[SamplingFilter] = None
+    listener: Optional[QueueListener] = None
+
+
+_state = _Logging()
+
+
+def setup_logging():
+    """Configurar el logger "app": cola en memoria + hilo que escribe a stdout"""
+    if _state.listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
+            defaults={"request_id": "-"}
+        ))
+
+    _state.handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _state.sampler = SamplingFilter(settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_WINDOW_SECONDS)
+    _state.handler.addFilter(_state.sampler)
+
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.addHandler(_state.handler)
+    logger.propagate = False
+
+    _state.listener = QueueListener(_state.handler.queue, output, respect_handler_level=True)
+    _state.listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Escribir lo pendiente y detener el hilo del listener"""
+    if _state.listener is None:
+        return
+    _state.listener.stop()
+    _state.listener = None
+    logging.getLogger("app").removeHandler(_state.handler)
+
+
+def log_stats() -> dict:
+    if _state.handler is None:
+        return {}
+    return {
+        "queued": _state.handler.queue.qsize(),
+        "dropped": _state.handler.dropped,
+        "suppressed": _state.sampler.suppressed_total,
+    }
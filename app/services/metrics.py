@@ -0,0 +1,194 @@
+import bisect
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Límites de los buckets de latencia en segundos (estilo Prometheus)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos.
+
+    observe() solo incrementa enteros de una lista desde el event loop, sin
+    locks; los hilos del driver de MongoDB pueden perder alguna muestra
+    ocasional en una carrera, lo cual es aceptable para métricas.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Registro en memoria de las métricas del proceso"""
+
+    def __init__(self):
+        self.started = time.time()
+        # (ruta, método, status) -> histograma
+        self.requests: Dict[Tuple[str, str, int], Histogram] = {}
+        # método -> solicitudes en curso (la ruta aún no se conoce al empezar)
+        self.in_flight: Dict[str, int] = {}
+        # ruta -> rechazos por rate limit
+        self.rate_limited: Dict[str, int] = {}
+        # (comando, colección, resultado) -> histograma
+        self.db_commands: Dict[Tuple[str, str, str], Histogram] = {}
+        # (pool, resultado) -> histograma de espera por una conexión
+        self.db_pool_checkouts: Dict[Tuple[str, str], Histogram] = {}
+        # (pool, estado) -> conexiones (open, in_use) o solicitudes en espera (waiting)
+        self.db_pool: Dict[Tuple[str, str], int] = {}
+        # nombre -> (descripción, función que devuelve el valor actual, tipo)
+        self.callbacks: Dict[str, Tuple[str, Callable[[], float], str]] = {}
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        key = (route, method, status)
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests[key] = Histogram()
+        histogram.observe(seconds)
+
+    def request_started(self, method: str):
+        self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str):
+        self.in_flight[method] = self.in_flight.get(method, 1) - 1
+
+    def rate_limit_rejected(self, route: str):
+        self.rate_limited[route] = self.rate_limited.get(route, 0) + 1
+
+    def observe_db_command(self, command: str, collection: str, outcome: str, seconds: float):
+        key = (command, collection, outcome)
+        histogram = self.db_commands.get(key)
+        if histogram is None:
+            histogram = self.db_commands.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def observe_pool_checkout(self, pool: str, outcome: str, seconds: float):
+        key = (pool, outcome)
+        histogram = self.db_pool_checkouts.get(key)
+        if histogram is None:
+            histogram = self.db_pool_checkouts.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def set_db_pool(self, pool: str, state: str, value: int):
+        self.db_pool[(pool, state)] = value
+
+    def register_gauge(self, name: str, description: str, callback: Callable[[], float]):
+        """Registrar un gauge que se evalúa solo al exportar /metrics"""
+        self.callbacks[name] = (description, callback, "gauge")
+
+    def register_counter(self, name: str, description: str, callback: Callable[[], float]):
+        """
+        Registrar un contador (solo sube) que se evalúa al exportar /metrics;
+        `name` debe terminar en _total, como ppt_rate_limit_rejections_total
+        """
+        self.callbacks[name] = (description, callback, "counter")
+
+    # ===================================
+    # Exportación en formato Prometheus
+    # ===================================
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        parts = []
+        for name, value in labels.items():
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            parts.append(f'{name}="{value}"')
+        return "{" + ",".join(parts) + "}"
+
+    def _histogram_lines(self, name: str, histogram: Histogram, labels: dict) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{self._labels(**labels, le=bound)} {cumulative}")
+        cumulative += histogram.counts[-1]
+        lines.append(f"{name}_bucket{self._labels(**labels, le='+Inf')} {cumulative}")
+        lines.append(f"{name}_sum{self._labels(**labels)} {histogram.total}")
+        lines.append(f"{name}_count{self._labels(**labels)} {histogram.count}")
+        return lines
+
+    def render(self) -> str:
+        lines = [
+            "# HELP ppt_process_start_time_seconds Inicio del proceso (epoch)",
+            "# TYPE ppt_process_start_time_seconds gauge",
+            f"ppt_process_start_time_seconds {self.started}",
+            "# HELP ppt_http_request_duration_seconds Latencia por ruta",
+            "# TYPE ppt_http_request_duration_seconds histogram",
+        ]
+        for (route, method, status), histogram in list(self.requests.items()):
+            lines += self._histogram_lines(
+                "ppt_http_request_duration_seconds",
+                histogram,
+                {"route": route, "method": method, "status": status},
+            )
+
+        lines += [
+            "# HELP ppt_http_requests_in_flight Solicitudes en curso",
+            "# TYPE ppt_http_requests_in_flight gauge",
+        ]
+        for method, value in list(self.in_flight.items()):
+            lines.append(f"ppt_http_requests_in_flight{self._labels(method=method)} {value}")
+
+        lines += [
+            "# HELP ppt_rate_limit_rejections_total Solicitudes rechazadas por rate limit",
+            "# TYPE ppt_rate_limit_rejections_total counter",
+        ]
+        for route, value in list(self.rate_limited.items()):
+            lines.append(f"ppt_rate_limit_rejections_total{self._labels(route=route)} {value}")
+
+        lines += [
+            "# HELP ppt_db_command_duration_seconds Latencia de comandos de MongoDB",
+            "# TYPE ppt_db_command_duration_seconds histogram",
+        ]
+        for (command, collection, outcome), histogram in list(self.db_commands.items()):
+            lines += self._histogram_lines(
+                "ppt_db_command_duration_seconds",
+                histogram,
+                {"command": command, "collection": collection, "outcome": outcome},
+            )
+
+        lines += [
+            "# HELP ppt_db_pool_checkout_seconds Espera por una conexión del pool de MongoDB",
+            "# TYPE ppt_db_pool_checkout_seconds histogram",
+        ]
+        for (pool, outcome), histogram in list(self.db_pool_checkouts.items()):
+            lines += self._histogram_lines(
+                "ppt_db_pool_checkout_seconds",
+                histogram,
+                {"pool": pool, "outcome": outcome},
+            )
+
+        lines += [
+            "# HELP ppt_db_pool_connections Conexiones y cola de espera del pool de MongoDB",
+            "# TYPE ppt_db_pool_connections gauge",
+        ]
+        for (pool, state), value in list(self.db_pool.items()):
+            lines.append(f"ppt_db_pool_connections{self._labels(pool=pool, state=state)} {value}")
+
+        for name, (description, callback, kind) in list(self.callbacks.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines += [
+                f"# HELP {name} {description}",
+                f"# TYPE {name} {kind}",
+                f"{name} {value}",
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,94 @@
+from typing import Dict, Optional
+
+# Rango válido de puntuaciones (ver LeaderboardEntry.score)
+MIN_SCORE = -500
+MAX_SCORE = 500
+BUCKETS = MAX_SCORE - MIN_SCORE + 1
+
+
+class RankIndex:
+    """
+    Histograma de puntuaciones por modo sobre un árbol de Fenwick.
+
+    Como las puntuaciones son enteros en [-500, 500] hay un bucket por valor
+    posible (1001), así que la posición de cualquier puntuación se obtiene
+    con una suma de prefijos de ~10 pasos, sin importar cuántas entradas
+    haya en la base de datos.
+    """
+
+    def __init__(self):
+        # modo -> árbol de Fenwick (índices 1..BUCKETS)
+        self._trees: Dict[str, list] = {}
+        self._totals: Dict[str, int] = {}
+
+    @staticmethod
+    def _bucket(score: int) -> int:
+        return int(score) - MIN_SCORE + 1
+
+    def is_loaded(self, mode: str) -> bool:
+        return mode in self._trees
+
+    def load(self, mode: str, histogram: Dict[int, int]):
+        """Reconstruir un modo a partir de {score: cantidad}"""
+        tree = [0] * (BUCKETS + 1)
+        total = 0
+        for score, count in histogram.items():
+            if MIN_SCORE <= score <= MAX_SCORE:
+                tree[self._bucket(score)] += count
+                total += count
+
+        # Construcción en O(n): cada nodo suma su valor al padre
+        for index in range(1, BUCKETS + 1):
+            parent = index + (index & -index)
+            if parent <= BUCKETS:
+                tree[parent] += tree[index]
+
+        self._trees[mode] = tree
+        self._totals[mode] = total
+
+    def add(self, mode: str, score: int, count: int = 1):
+        """Registrar una puntuación nueva (ignorado si el modo no está cargado)"""
+        tree = self._trees.get(mode)
+        if tree is None or not MIN_SCORE <= score <= MAX_SCORE:
+            return
+
+        index = self._bucket(score)
+        while index <= BUCKETS:
+            tree[index] += count
+            index += index & -index
+        self._totals[mode] += count
+
+    @staticmethod
+    def _prefix(tree: list, index: int) -> int:
+        """Cantidad de entradas en los buckets 1..index"""
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    def rank(self, mode: str, score: int) -> Optional[dict]:
+        """
+        Posición que ocupa una puntuación, o None si el modo no está cargado
+
+        rank: 1 + entradas con puntuación estrictamente mayor (los empates
+        comparten posición). percentile: % de entradas con puntuación menor.
+        """
+        tree = self._trees.get(mode)
+        if tree is None:
+            return None
+
+        score = max(MIN_SCORE, min(MAX_SCORE, int(score)))
+        total = self._totals[mode]
+        at_or_below = self._prefix(tree, self._bucket(score))
+        below = self._prefix(tree, self._bucket(score) - 1)
+
+        return {
+            "rank": total - at_or_below + 1,
+            "total": total,
+            "percentile": round(100 * below / total, 2) if total else 100.0,
+        }
+
+    def clear(self):
+        self._trees.clear()
+        self._totals.clear()
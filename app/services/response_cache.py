@@ -0,0 +1,53 @@
+import hashlib
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Cuerpos JSON ya codificados del leaderboard, válidos mientras no cambie
+    la versión de su modo.
+
+    save_leaderboard_entry() y las recargas del caché incrementan la
+    versión del modo; la siguiente lectura vuelve a codificar una sola vez
+    y las demás reutilizan los mismos bytes y el mismo ETag.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.versions: Dict[str, int] = {}
+        # clave -> (versión del modo, cuerpo, etag)
+        self._entries: Dict[Hashable, Tuple[int, bytes, str]] = {}
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        # Derivado del contenido: todas las instancias dan el mismo ETag
+        # para el mismo tablero
+        return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+    def version(self, mode: str) -> int:
+        return self.versions.get(mode, 0)
+
+    def bump(self, mode: str):
+        self.versions[mode] = self.versions.get(mode, 0) + 1
+
+    def get(self, key: Hashable, mode: str) -> Optional[Tuple[bytes, str]]:
+        """(cuerpo, etag) si sigue vigente para la versión actual del modo"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != self.version(mode):
+            return None
+        return entry[1], entry[2]
+
+    def put(self, key: Hashable, version: int, body: bytes) -> Tuple[bytes, str]:
+        """
+        Guardar un cuerpo codificado a partir de los datos de `version`
+        (la versión leída antes de consultar, por si hubo un guardado entre medio)
+        """
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            # Solo crecen las claves de ventanas pasadas; basta con empezar de nuevo
+            self._entries.clear()
+        etag = self.etag_for(body)
+        self._entries[key] = (version, body, etag)
+        return body, etag
+
+    def clear(self):
+        self._entries.clear()
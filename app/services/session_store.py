@@ -0,0 +1,245 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.config import settings
+from app.services.game_logic import GameLogic, AdaptivePredictor, ADAPTIVE_MODE
+
+
+class TTLStore:
+    """
+    Almacén en memoria con expiración (TTL) y desalojo LRU.
+
+    Cada acceso renueva el TTL y mueve la clave al final, así que el
+    OrderedDict queda ordenado por vencimiento y las entradas expiradas
+    siempre están al principio.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        now = time.monotonic()
+        if item[0] <= now:
+            del self._items[key]
+            return None
+
+        self._items[key] = (now + self.ttl_seconds, item[1])
+        self._items.move_to_end(key)
+        return item[1]
+
+    def set(self, key: str, value: Any):
+        self.sweep()
+        self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end(key)
+
+        # Desalojar las entradas menos usadas si se supera el máximo
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[Any]:
+        item = self._items.pop(key, None)
+        return item[1] if item is not None else None
+
+    def sweep(self):
+        """Eliminar las entradas expiradas (siempre al inicio del orden)"""
+        now = time.monotonic()
+        items = self._items
+        while items:
+            key, (expires_at, _) = next(iter(items.items()))
+            if expires_at > now:
+                break
+            del items[key]
+
+    def clear(self):
+        self._items.clear()
+
+
+class MatchSession:
+    """Estado compacto de una partida al mejor de N rondas"""
+
+    __slots__ = ("mode", "rounds", "player_wins", "cpu_wins", "ties", "predictor")
+
+    def __init__(self, mode: str, rounds: int):
+        self.mode = mode
+        self.rounds = rounds
+        self.player_wins = 0
+        self.cpu_wins = 0
+        self.ties = 0
+        # En el modo adaptativo la CPU aprende de las rondas de esta partida
+        self.predictor = AdaptivePredictor(settings.ADAPTIVE_ORDER) if mode == ADAPTIVE_MODE else None
+
+    @property
+    def rounds_played(self) -> int:
+        return self.player_wins + self.cpu_wins + self.ties
+
+    @property
+    def finished(self) -> bool:
+        return self.rounds_played >= self.rounds
+
+    def record(self, result: str):
+        if result == "player":
+            self.player_wins += 1
+        elif result == "cpu":
+            self.cpu_wins += 1
+        else:
+            self.ties += 1
+
+    def score(self) -> int:
+        return GameLogic.calculate_score(self.player_wins, self.cpu_wins, self.ties)
+
+    def to_dict(self) -> dict:
+        return {
+            "player_wins": self.player_wins,
+            "cpu_wins": self.cpu_wins,
+            "ties": self.ties,
+            "rounds_played": self.rounds_played,
+            "rounds": self.rounds,
+            "finished": self.finished,
+            "score": self.score(),
+        }
+
+
+class MatchError(Exception):
+    """Error al usar una partida; status_code sigue la semántica HTTP"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class MatchStore(TTLStore):
+    """Partidas activas del servidor"""
+
+    def create(self, mode: str, rounds: int) -> Tuple[str, MatchSession]:
+        match_id = secrets.token_urlsafe(12)
+        match = MatchSession(mode, rounds)
+        self.set(match_id, match)
+        return match_id, match
+
+    def _lookup(self, match_id: str, mode: str) -> MatchSession:
+        match = self.get(match_id)
+        if match is None:
+            raise MatchError(404, "Partida no encontrada o expirada")
+        if match.mode != mode:
+            raise MatchError(400, "El modo no coincide con el de la partida")
+        return match
+
+    def get_playable(self, match_id: str, mode: str) -> MatchSession:
+        """Partida en curso donde se puede jugar otra ronda"""
+        match = self._lookup(match_id, mode)
+        if match.finished:
+            raise MatchError(409, "La partida ya terminó")
+        return match
+
+    def take_finished(self, match_id: str, mode: str) -> MatchSession:
+        """Retirar una partida terminada para guardar su puntuación (una sola vez)"""
+        match = self._lookup(match_id, mode)
+        if not match.finished:
+            raise MatchError(409, "La partida aún no termina")
+        self.pop(match_id)
+        return match
+
+
+match_store = MatchStore(
+    max_items=settings.MAX_ACTIVE_MATCHES,
+    ttl_seconds=settings.MATCH_TTL_SECONDS,
+)
+
+
+class PredictorStore(TTLStore):
+    """Historial del modo adaptativo por jugador, fuera de una partida"""
+
+    def for_player(self, key: str) -> AdaptivePredictor:
+        predictor = self.get(key)
+        if predictor is None:
+            predictor = AdaptivePredictor(settings.ADAPTIVE_ORDER)
+            self.set(key, predictor)
+        return predictor
+
+
+predictor_store = PredictorStore(
+    max_items=settings.ADAPTIVE_MAX_PLAYERS,
+    ttl_seconds=settings.ADAPTIVE_TTL_SECONDS,
+)
+
+
+class IdempotencyKeyReused(Exception):
+    """La misma Idempotency-Key llegó con otro contenido"""
+
+
+class IdempotencyStore(TTLStore):
+    """
+    Resultados recientes por Idempotency-Key: (huella de la solicitud,
+    resultado). Mientras la solicitud original sigue en curso su Future
+    queda aparte, fuera del TTL y del desalojo LRU, y los reintentos
+    esperan su resultado en lugar de escribir.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float):
+        super().__init__(max_items, ttl_seconds)
+        # Clave -> (huella, Future) de las solicitudes en curso
+        self._pending: Dict[str, Tuple[Hashable, asyncio.Future]] = {}
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self._pending)
+
+    async def begin(self, key: str, fingerprint: Hashable) -> Optional[Any]:
+        """
+        Resultado guardado para repetir, o None si esta solicitud debe
+        procesarse (y luego llamar siempre a complete() o abort())
+        """
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                item = self.get(key)
+                if item is None:
+                    self._pending[key] = (fingerprint, asyncio.get_running_loop().create_future())
+                    return None
+            else:
+                item = pending
+
+            stored_fingerprint, value = item
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyKeyReused(key)
+            if pending is None:
+                return value
+
+            # La original terminó bien o mal: volver a mirar
+            await asyncio.shield(value)
+
+    def _release(self, key: str):
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending[1].done():
+            pending[1].set_result(None)
+
+    def complete(self, key: str, fingerprint: Hashable, result: Any):
+        # Guardar antes de despertar a los reintentos, para que lo repitan
+        self.set(key, (fingerprint, result))
+        self._release(key)
+
+    def abort(self, key: str):
+        """La solicitud falló: el siguiente reintento la procesa de nuevo"""
+        self._release(key)
+
+    def clear(self):
+        super().clear()
+        for key in list(self._pending):
+            self._release(key)
+
+
+idempotency_store = IdempotencyStore(
+    max_items=settings.IDEMPOTENCY_MAX_KEYS,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+)
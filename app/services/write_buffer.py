@@ -0,0 +1,127 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class WriteBufferFull(Exception):
+    """La cola de escrituras sigue llena después del tiempo de espera"""
+
+
+# Recibe (modo, documentos) y devuelve {índice: excepción} de los que fallaron
+BulkWriter = Callable[[str, List[dict]], Awaitable[Dict[int, Exception]]]
+
+
+class LeaderboardWriteBuffer:
+    """
+    Cola asíncrona que agrupa las puntuaciones por modo y las escribe en
+    lotes (insert_many): cada lote lleva lo que esté en cola en ese momento,
+    hasta batch_size o lo acumulado durante flush_interval.
+
+    Cada llamador espera a que su lote se confirme, por lo que los errores
+    de escritura siguen llegando a la ruta que los originó.
+    """
+
+    def __init__(
+        self,
+        writer: BulkWriter,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+        put_timeout: float,
+    ):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, mode: str, document: dict):
+        """Encolar un documento y esperar a que su lote se escriba"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            # Backpressure: esperar espacio en la cola, pero no indefinidamente
+            await asyncio.wait_for(
+                self._queue.put((mode, document, future)),
+                timeout=self.put_timeout
+            )
+        except asyncio.TimeoutError:
+            raise WriteBufferFull("Cola de escrituras llena")
+        return await future
+
+    async def stop(self):
+        """Escribir todo lo pendiente y detener el proceso de vaciado"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+        # Entradas encoladas mientras se procesaba la señal de cierre
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        if remaining:
+            await self._flush(remaining)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            # Sin esperar: se toma lo que ya está en cola. Mientras un lote
+            # se escribe llegan los siguientes, así que bajo carga los lotes
+            # crecen solos; el intervalo solo limita cuánto se acumula
+            while len(batch) < self.batch_size and loop.time() < deadline:
+                if self._queue.empty():
+                    # Ceder una vez para sumar lo encolado en esta misma vuelta del loop
+                    await asyncio.sleep(0)
+                    if self._queue.empty():
+                        break
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        by_mode: Dict[str, list] = {}
+        for mode, document, future in batch:
+            by_mode.setdefault(mode, []).append((document, future))
+
+        for mode, items in by_mode.items():
+            documents = [document for document, _ in items]
+            try:
+                failures = await self.writer(mode, documents)
+            except Exception as e:
+                failures = {index: e for index in range(len(items))}
+
+            for index, (document, future) in enumerate(items):
+                if future.done():
+                    continue
+                if index in failures:
+                    future.set_exception(failures[index])
+                else:
+                    future.set_result(document["_id"])
@@ -0,0 +1,154 @@
+"""
+Cliente ASGI mínimo para ejecutar la aplicación dentro del mismo proceso,
+sin sockets ni dependencias extra, de modo que los benchmarks miden la
+aplicación y no el cliente HTTP.
+"""
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+
+class ASGIClient:
+    def __init__(self, app, client_host: str = "127.0.0.1"):
+        self.app = app
+        self.client_host = client_host
+        self._lifespan_task: Optional[asyncio.Task] = None
+        self._lifespan_queue: asyncio.Queue = None
+        self._lifespan_events: asyncio.Queue = None
+
+    # ===================================
+    # Lifespan (eventos startup/shutdown)
+    # ===================================
+
+    async def startup(self):
+        self._lifespan_queue = asyncio.Queue()
+        self._lifespan_events = asyncio.Queue()
+
+        async def receive():
+            return await self._lifespan_queue.get()
+
+        async def send(message):
+            await self._lifespan_events.put(message)
+
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(self.app(scope, receive, send))
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        message = await self._lifespan_events.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"Fallo en startup: {message}")
+
+    async def shutdown(self):
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._lifespan_events.get()
+        await self._lifespan_task
+
+    # ===================================
+    # HTTP
+    # ===================================
+
+    def _scope(self, scope_type: str, path: str, headers: List[Tuple[bytes, bytes]]) -> dict:
+        path, _, query = path.partition("?")
+        return {
+            "type": scope_type,
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "http" if scope_type == "http" else "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")] + headers,
+            "client": (self.client_host, 50000),
+            "server": ("bench", 80),
+        }
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body=None,
+        headers: Optional[List[Tuple[bytes, bytes]]] = None,
+        content: Optional[bytes] = None,
+    ) -> Tuple[int, dict, bytes]:
+        # content: cuerpo tal cual, con los headers que pase el llamador
+        request_headers = list(headers or [])
+        if content is not None:
+            body = content
+        else:
+            body = b"" if json_body is None else json.dumps(json_body).encode()
+            if json_body is not None:
+                request_headers.append((b"content-type", b"application/json"))
+        if body:
+            request_headers.append((b"content-length", str(len(body)).encode()))
+
+        scope = self._scope("http", path, request_headers)
+        scope["method"] = method
+
+        sent_body = False
+        disconnect = asyncio.Event()
+        status = 0
+        response_headers = {}
+        chunks = []
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    response_headers[name.decode().lower()] = value.decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    disconnect.set()
+
+        await self.app(scope, receive, send)
+        disconnect.set()
+        return status, response_headers, b"".join(chunks)
+
+    # ===================================
+    # WebSocket
+    # ===================================
+
+    async def websocket(self, path: str) -> "WebSocketSession":
+        session = WebSocketSession(self.app, self._scope("websocket", path, []))
+        await session.connect()
+        return session
+
+
+class WebSocketSession:
+    def __init__(self, app, scope: dict):
+        self.app = app
+        self.scope = scope
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self._task = asyncio.create_task(
+            self.app(self.scope, self._to_app.get, self._from_app.put)
+        )
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket rechazado: {message}")
+
+    async def send_json(self, data):
+        await self._to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self):
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            raise RuntimeError("WebSocket cerrado por el servidor")
+        return json.loads(message.get("text") or message.get("bytes"))
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
@@ -0,0 +1,95 @@
+"""
+Comprobar que el camino rápido de /api/game/play responde exactamente igual
+que la ruta validada por FastAPI (mismo código y mismo cuerpo), incluidos
+los cuerpos mal formados.
+
+Ambas variantes se montan sobre la misma aplicación de prueba, con los
+mismos manejadores de excepciones que app.main.
+
+Uso:
+    python -m benchmarks.parity
+"""
+import asyncio
+import os
+import random
+import sys
+
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("ENVIRONMENT", "development")
+
+from benchmarks.asgi import ASGIClient  # noqa: E402
+
+JSON = [(b"content-type", b"application/json")]
+
+# (descripción, cuerpo, headers). Con la misma semilla la CPU juega lo mismo,
+# así que también las respuestas correctas deben coincidir byte a byte
+CASES = [
+    ("jugada válida", b'{"player_move": 1, "mode": "imposible"}', JSON),
+    ("sin Content-Type", b'{"player_move": 1, "mode": "imposible"}', []),
+    ("application/json; charset", b'{"player_move": 2, "mode": "imposible"}', [(b"content-type", b"application/json; charset=utf-8")]),
+    ("subtipo +json", b'{"player_move": 3, "mode": "imposible"}', [(b"content-type", b"application/vnd.ppt+json")]),
+    ("text/plain con JSON válido", b'{"player_move": 1, "mode": "imposible"}', [(b"content-type", b"text/plain")]),
+    ("formulario", b"player_move=1&mode=imposible", [(b"content-type", b"application/x-www-form-urlencoded")]),
+    ("application/xml", b"<play/>", [(b"content-type", b"application/xml")]),
+    ("cuerpo vacío", b"", JSON),
+    ("null", b"null", JSON),
+    ("JSON inválido", b'{"player_move": ', JSON),
+    ("no UTF-8", b'{"player_move": "\xff"}', JSON),
+    ("lista", b"[1, 2]", JSON),
+    ("cadena", b'"piedra"', JSON),
+    ("número", b"1", JSON),
+    ("modo lista", b'{"player_move": 1, "mode": ["imposible"]}', JSON),
+    ("modo objeto", b'{"player_move": 1, "mode": {"a": 1}}', JSON),
+    ("modo desconocido", b'{"player_move": 1, "mode": "facil"}', JSON),
+    ("jugada fuera de rango", b'{"player_move": 7, "mode": "imposible"}', JSON),
+    ("jugada como texto", b'{"player_move": "1", "mode": "imposible"}', JSON),
+    ("jugada decimal", b'{"player_move": 1.0, "mode": "imposible"}', JSON),
+    ("jugada booleana", b'{"player_move": true, "mode": "imposible"}', JSON),
+    ("sin jugada", b'{"mode": "imposible"}', JSON),
+    ("partida inexistente", b'{"player_move": 1, "mode": "imposible", "match_id": "nope"}', JSON),
+]
+
+
+def _app(endpoint):
+    from fastapi import FastAPI
+    from app.main import app as main_app
+    from app.routes import game
+
+    app = FastAPI(exception_handlers=dict(main_app.exception_handlers))
+    app.post("/play", **game._PLAY_ROUTE)(endpoint)
+    return app
+
+
+async def check() -> int:
+    from app.routes import game
+
+    validated = ASGIClient(_app(game.play_round))
+    fast = ASGIClient(_app(game.play_round_fast))
+
+    mismatches = 0
+    for name, body, headers in CASES:
+        random.seed(name)
+        expected = await validated.request("POST", "/play", headers=headers, content=body)
+        random.seed(name)
+        actual = await fast.request("POST", "/play", headers=headers, content=body)
+        same = expected[0] == actual[0] and expected[2] == actual[2]
+        print(f"  {'OK ' if same else 'ERR'} {name:<28} {expected[0]} {actual[0]}")
+        if not same:
+            mismatches += 1
+            print(f"      validada: {expected[2].decode(errors='replace')}")
+            print(f"      rápida:   {actual[2].decode(errors='replace')}")
+    return mismatches
+
+
+def main():
+    mismatches = asyncio.run(check())
+    if mismatches:
+        print(f"\n{mismatches} de {len(CASES)} casos difieren")
+        sys.exit(1)
+    print(f"\nLos {len(CASES)} casos coinciden")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+Benchmarks reproducibles de las rutas críticas de la API.
+
+La aplicación se ejecuta dentro del proceso (ASGI directo) con SQLite en
+memoria como sustituto local de MongoDB y sin rate limiting, así que los
+resultados no dependen de la red ni de Atlas.
+
+Uso:
+    python -m benchmarks.run
+    python -m benchmarks.run --concurrency 1,16,64 --requests 5000
+    python -m benchmarks.run --scenarios play,leaderboard_get --no-micro
+    python -m benchmarks.run --compare benchmarks/results/20250105T120000Z.json
+
+Cualquier variable de configuración (por ejemplo LEADERBOARD_CACHE_ENABLED)
+puede pasarse por entorno para comparar variantes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+# Configuración del entorno de benchmark antes de importar la aplicación
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("ENVIRONMENT", "development")
+
+from benchmarks.asgi import ASGIClient  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+NAMES = ["ANA", "LUIS", "BOT1", "BOT2", "MAX", "ZOE"]
+
+
+# ===================================
+# Estadísticas
+# ===================================
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(scenario: str, concurrency: int, latencies, errors: int, elapsed: float, cpu: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "cpu_us_per_request": round(cpu / count * 1e6, 1) if count else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if count else 0.0,
+        },
+    }
+
+
+# ===================================
+# Escenarios HTTP / WebSocket
+# ===================================
+
+def _play_request(i: int):
+    return "POST", "/api/game/play", {
+        "player_move": random.randint(1, 3),
+        "mode": random.choice(["normal", "imposible"]),
+    }
+
+
+def _play_adaptativo_request(i: int):
+    # Patrón cíclico: el predictor lo aprende y se mide el costo por jugada
+    return "POST", "/api/game/play", {
+        "player_move": i % 3 + 1,
+        "mode": "adaptativo",
+    }
+
+
+def _leaderboard_get_request(i: int):
+    return "GET", f"/api/leaderboard/{random.choice(['normal', 'imposible'])}", None
+
+
+def _leaderboard_page_request(i: int):
+    # Cursor a una profundidad aleatoria: la mayoría de las páginas quedan
+    # fuera del top-N en memoria y van al índice
+    from app.services.database import encode_cursor
+    cursor = encode_cursor((random.randint(-500, 500), datetime.utcnow(), "f" * 24))
+    mode = random.choice(["normal", "imposible"])
+    return "GET", f"/api/leaderboard/{mode}?limit=50&after={cursor}", None
+
+
+def _leaderboard_window_request(i: int):
+    mode = random.choice(["normal", "imposible"])
+    return "GET", f"/api/leaderboard/{mode}?window={random.choice(['day', 'week'])}", None
+
+
+def _leaderboard_rank_request(i: int):
+    mode = random.choice(["normal", "imposible"])
+    return "GET", f"/api/leaderboard/{mode}/rank?score={random.randint(-500, 500)}", None
+
+
+def _leaderboard_post_request(i: int):
+    return "POST", "/api/leaderboard/", {
+        "player_name": random.choice(NAMES),
+        "score": random.randint(-500, 500),
+        "mode": random.choice(["normal", "imposible"]),
+    }
+
+
+HTTP_SCENARIOS = {
+    "play": _play_request,
+    "play_adaptativo": _play_adaptativo_request,
+    "leaderboard_post": _leaderboard_post_request,
+    "leaderboard_get": _leaderboard_get_request,
+    "leaderboard_page": _leaderboard_page_request,
+    "leaderboard_window": _leaderboard_window_request,
+    "leaderboard_rank": _leaderboard_rank_request,
+}
+
+
+async def run_http(client: ASGIClient, scenario: str, total: int, concurrency: int) -> dict:
+    make_request = HTTP_SCENARIOS[scenario]
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            method, path, body = make_request(i)
+            start = time.perf_counter()
+            status, _, _ = await client.request(method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    return summarize(scenario, concurrency, latencies, errors, elapsed, cpu)
+
+
+async def run_ws_play(client: ASGIClient, total: int, concurrency: int) -> dict:
+    """Rondas sobre WebSocket: una conexión por worker, como un cliente móvil"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        session = await client.websocket("/api/game/ws")
+        try:
+            for i in remaining:
+                _, _, body = _play_request(i)
+                body["type"] = "play"
+                start = time.perf_counter()
+                await session.send_json(body)
+                response = await session.receive_json()
+                latencies.append(time.perf_counter() - start)
+                if response.get("type") == "error":
+                    errors += 1
+        finally:
+            await session.close()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    return summarize("ws_play", concurrency, latencies, errors, elapsed, cpu)
+
+
+SCENARIOS = ["play", "play_adaptativo", "ws_play", "leaderboard_post", "leaderboard_get", "leaderboard_page", "leaderboard_window", "leaderboard_rank"]
+
+
+async def _wait_until_ready(client: ASGIClient, timeout: float = 30.0):
+    """Esperar a que /ready responda 200 (índices y cachés cargados)"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        status, _, _ = await client.request("GET", "/ready")
+        if status == 200:
+            return
+        await asyncio.sleep(0.05)
+    raise RuntimeError("La aplicación no quedó lista a tiempo")
+
+
+async def run_scenarios(scenarios, total: int, concurrency_levels) -> list:
+    from app.main import app
+
+    client = ASGIClient(app)
+    await client.startup()
+    await _wait_until_ready(client)
+    results = []
+    try:
+        for scenario in scenarios:
+            for concurrency in concurrency_levels:
+                if scenario == "ws_play":
+                    result = await run_ws_play(client, total, concurrency)
+                else:
+                    result = await run_http(client, scenario, total, concurrency)
+                results.append(result)
+                _print_http(result)
+    finally:
+        await client.shutdown()
+    return results
+
+
+# ===================================
+# Micro-benchmarks
+# ===================================
+
+def _time_call(stmt, setup="pass", namespace=None) -> float:
+    """Nanosegundos por llamada (mejor de 5 repeticiones)"""
+    timer = timeit.Timer(stmt, setup=setup, globals=namespace)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    return round(best / number * 1e9, 1)
+
+
+def micro_benchmarks() -> dict:
+    import numpy as np
+    from app.services.game_logic import GameLogic, AdaptivePredictor
+    from app.schemas.game_schemas import PlayRequest, PlayBatchRequest
+    from app.schemas.leaderboard_schemas import LeaderboardEntry
+
+    moves = np.random.default_rng(0).integers(1, 4, size=1000, dtype=np.int8)
+    namespace = {
+        "GameLogic": GameLogic,
+        "predictor": AdaptivePredictor(),
+        "PlayRequest": PlayRequest,
+        "PlayBatchRequest": PlayBatchRequest,
+        "LeaderboardEntry": LeaderboardEntry,
+        "moves": moves,
+        "moves_list": moves.tolist(),
+    }
+
+    cases = {
+        "GameLogic.evaluate_round": "GameLogic.evaluate_round(1, 3)",
+        "GameLogic.get_cpu_move_normal": "GameLogic.get_cpu_move_normal()",
+        "GameLogic.get_cpu_move_imposible": "GameLogic.get_cpu_move_imposible(2)",
+        "GameLogic.play[normal]": "GameLogic.play('normal', 1)",
+        "GameLogic.play[adaptativo]": "GameLogic.play('adaptativo', 1, predictor)",
+        "AdaptivePredictor.cpu_move": "predictor.cpu_move()",
+        "AdaptivePredictor.update": "predictor.update(2)",
+        "GameLogic.calculate_score": "GameLogic.calculate_score(3, 1, 1)",
+        "GameLogic.evaluate_rounds[1000]": "GameLogic.evaluate_rounds(moves, moves)",
+        "GameLogic.get_cpu_moves_imposible[1000]": "GameLogic.get_cpu_moves_imposible(moves)",
+        "GameLogic.get_cpu_moves_adaptativo[1000]": "GameLogic.get_cpu_moves_adaptativo(moves, predictor)",
+        "PlayRequest.model_validate": "PlayRequest.model_validate({'player_move': 1, 'mode': 'normal'})",
+        "PlayRequest.model_validate_json": "PlayRequest.model_validate_json(b'{\"player_move\":1,\"mode\":\"normal\"}')",
+        "PlayBatchRequest.model_validate[1000]": "PlayBatchRequest.model_validate({'player_moves': moves_list, 'mode': 'normal'})",
+        "LeaderboardEntry.model_validate": "LeaderboardEntry.model_validate({'player_name': 'luis', 'score': 300, 'mode': 'normal'})",
+    }
+
+    results = {}
+    for name, stmt in cases.items():
+        results[name] = {"ns_per_call": _time_call(stmt, namespace=namespace)}
+        print(f"  {name:<45} {results[name]['ns_per_call']:>12,.1f} ns")
+    return results
+
+
+# ===================================
+# Salida
+# ===================================
+
+def _print_http(result: dict):
+    latency = result["latency_ms"]
+    print(
+        f"  {result['scenario']:<18} c={result['concurrency']:<4} "
+        f"{result['rps']:>9,.1f} req/s  "
+        f"p50={latency['p50']:.3f}ms p95={latency['p95']:.3f}ms p99={latency['p99']:.3f}ms  "
+        f"cpu={result['cpu_us_per_request']:.1f}us/req  errores={result['errors']}"
+    )
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=False
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    from app.config import settings
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "settings": {
+            "STORAGE_BACKEND": settings.STORAGE_BACKEND,
+            "LEADERBOARD_CACHE_ENABLED": settings.LEADERBOARD_CACHE_ENABLED,
+            "WRITE_BUFFER_ENABLED": settings.WRITE_BUFFER_ENABLED,
+            "RATE_LIMIT_ENABLED": settings.RATE_LIMIT_ENABLED,
+            "PLAY_FAST_PATH_ENABLED": settings.PLAY_FAST_PATH_ENABLED,
+            "RANK_INDEX_ENABLED": settings.RANK_INDEX_ENABLED,
+        },
+    }
+
+
+def _compare(results: dict, previous_path: str):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+
+    print(f"\nComparación con {previous_path}")
+    before = {(r["scenario"], r["concurrency"]): r for r in previous.get("http", [])}
+    for result in results["http"]:
+        old = before.get((result["scenario"], result["concurrency"]))
+        if not old or not old["rps"]:
+            continue
+        rps_delta = (result["rps"] - old["rps"]) / old["rps"] * 100
+        p99_delta = result["latency_ms"]["p99"] - old["latency_ms"]["p99"]
+        print(
+            f"  {result['scenario']:<18} c={result['concurrency']:<4} "
+            f"req/s {rps_delta:+.1f}%  p99 {p99_delta:+.3f}ms"
+        )
+
+    old_micro = previous.get("micro", {})
+    for name, value in results.get("micro", {}).items():
+        if name in old_micro and old_micro[name]["ns_per_call"]:
+            delta = (value["ns_per_call"] - old_micro[name]["ns_per_call"]) / old_micro[name]["ns_per_call"] * 100
+            print(f"  {name:<45} {delta:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la API de Piedra, Papel o Tijera")
+    parser.add_argument("--requests", type=int, default=2000, help="Solicitudes por escenario")
+    parser.add_argument("--concurrency", default="1,16", help="Niveles de concurrencia, separados por coma")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Escenarios, separados por coma")
+    parser.add_argument("--no-micro", action="store_true", help="Omitir micro-benchmarks")
+    parser.add_argument("--output", default=RESULTS_DIR, help="Directorio para guardar el JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de las solicitudes generadas")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+    concurrency_levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    results = {"meta": _metadata(args), "http": [], "micro": {}}
+
+    if scenarios:
+        print("Escenarios:")
+        results["http"] = asyncio.run(run_scenarios(scenarios, args.requests, concurrency_levels))
+
+    if not args.no_micro:
+        print("Micro-benchmarks:")
+        results["micro"] = micro_benchmarks()
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output, f"{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados guardados en {path}")
+
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Simulación Monte Carlo de los modos de juego, sin levantar el servidor.
+
+Juega millones de rondas y partidas con las mismas funciones de GameLogic
+que usa la API (las versiones por lotes de NumPy), repartidas entre
+procesos, y compara los resultados con las probabilidades que se derivan
+del código.
+
+Uso:
+    python -m benchmarks.simulate
+    python -m benchmarks.simulate --rounds 50000000 --matches 5000000 --workers 8
+    python -m benchmarks.simulate --modes adaptativo --player cyclic
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.services import game_logic
+from app.services.game_logic import GameLogic, AdaptivePredictor
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+MODES = ["normal", "imposible", "adaptativo"]
+PLAYERS = ["random", "biased", "cyclic"]
+# Códigos de evaluate_rounds: 0=tie, 1=player, 2=cpu
+OUTCOMES = ["tie", "player", "cpu"]
+
+# Lo que promete la documentación de cada modo (victorias de la CPU)
+ADVERTISED_CPU_WIN = {"imposible": 0.80}
+
+
+# ===================================
+# Probabilidades analíticas
+# ===================================
+
+def analytic_round(mode: str):
+    """
+    Probabilidad de (tie, player, cpu) en una ronda según el código, para
+    los modos donde cada ronda es independiente del jugador; None si no
+    """
+    if mode == "normal":
+        return (1 / 3, 1 / 3, 1 / 3)
+    if mode == "imposible":
+        # random.randint(0, 100) tiene 101 resultados y solo 0..19 juegan
+        # al azar: 20/101, no el 20% que sugiere el código
+        p_random = 20 / 101
+        return (p_random / 3, p_random / 3, 1 - 2 * p_random / 3)
+    return None
+
+
+def analytic_scores(probabilities, rounds: int) -> dict:
+    """Distribución exacta de calculate_score en una partida de `rounds` rondas"""
+    p_tie, p_player, p_cpu = probabilities
+    distribution = {}
+    for player_wins in range(rounds + 1):
+        for cpu_wins in range(rounds + 1 - player_wins):
+            ties = rounds - player_wins - cpu_wins
+            ways = math.factorial(rounds) // (
+                math.factorial(player_wins) * math.factorial(cpu_wins) * math.factorial(ties)
+            )
+            probability = ways * p_player ** player_wins * p_cpu ** cpu_wins * p_tie ** ties
+            score = GameLogic.calculate_score(player_wins, cpu_wins, ties)
+            distribution[score] = distribution.get(score, 0.0) + probability
+    return distribution
+
+
+# ===================================
+# Simulación (en los procesos)
+# ===================================
+
+def _player_moves(rng, player: str, count: int):
+    if player == "random":
+        return rng.integers(1, 4, size=count, dtype=np.int8)
+    if player == "biased":
+        # Prefiere piedra: 50% / 25% / 25%
+        return rng.choice(np.array([1, 2, 3], dtype=np.int8), size=count, p=[0.5, 0.25, 0.25])
+    return (np.arange(count) % 3 + 1).astype(np.int8)  # cyclic
+
+
+def _cpu_moves(mode: str, player_moves, session_rounds: int, order: int):
+    if mode == "normal":
+        return GameLogic.get_cpu_moves_normal(len(player_moves))
+    if mode == "imposible":
+        return GameLogic.get_cpu_moves_imposible(player_moves)
+
+    # Adaptativo: secuencial por naturaleza; un historial nuevo por sesión
+    return np.concatenate([
+        GameLogic.get_cpu_moves_adaptativo(player_moves[start:start + session_rounds], AdaptivePredictor(order))
+        for start in range(0, len(player_moves), session_rounds)
+    ])
+
+
+def _simulate(task: tuple):
+    """Una porción de rondas o partidas; devuelve conteos para sumar"""
+    kind, mode, count, seed, player, match_rounds, session_rounds, order = task
+    rng = np.random.default_rng(seed)
+    # GameLogic usa su propio generador (y random para el modo adaptativo):
+    # cada porción los reemplaza para que los procesos no repitan secuencias
+    game_logic._batch_tables()["rng"] = np.random.default_rng(rng.integers(2 ** 63))
+    random.seed(int(rng.integers(2 ** 63)))
+
+    if kind == "rounds":
+        player_moves = _player_moves(rng, player, count)
+        results = GameLogic.evaluate_rounds(player_moves, _cpu_moves(mode, player_moves, session_rounds, order))
+        return np.bincount(results, minlength=3).tolist()
+
+    # Partidas de match_rounds rondas, como MatchSession (un historial por partida)
+    player_moves = _player_moves(rng, player, count * match_rounds)
+    cpu_moves = _cpu_moves(mode, player_moves, match_rounds, order)
+    results = GameLogic.evaluate_rounds(player_moves, cpu_moves).reshape(count, match_rounds)
+    player_wins = (results == 1).sum(axis=1)
+    cpu_wins = (results == 2).sum(axis=1)
+    scores = GameLogic.calculate_score(player_wins, cpu_wins, match_rounds - player_wins - cpu_wins)
+    values, counts = np.unique(scores, return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
+
+
+def _tasks(kind: str, mode: str, total: int, chunk: int, seeds, args) -> list:
+    tasks = []
+    for start in range(0, total, chunk):
+        tasks.append((
+            kind, mode, min(chunk, total - start), next(seeds), args.player,
+            args.match_rounds, args.session_rounds, args.adaptive_order
+        ))
+    return tasks
+
+
+# ===================================
+# Reportes
+# ===================================
+
+def summarize_rounds(mode: str, counts: list, elapsed: float) -> dict:
+    total = sum(counts)
+    measured = [c / total for c in counts]
+    summary = {
+        "rounds": total,
+        "rounds_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "measured": dict(zip(OUTCOMES, measured)),
+    }
+
+    expected = analytic_round(mode)
+    if expected is not None:
+        p_cpu = expected[2]
+        summary["analytic"] = dict(zip(OUTCOMES, expected))
+        # Desviación de las victorias de la CPU en errores estándar
+        summary["cpu_z"] = (measured[2] - p_cpu) / math.sqrt(p_cpu * (1 - p_cpu) / total)
+    if mode in ADVERTISED_CPU_WIN:
+        summary["advertised_cpu_win"] = ADVERTISED_CPU_WIN[mode]
+    return summary
+
+
+def summarize_matches(mode: str, histogram: dict, match_rounds: int, elapsed: float) -> dict:
+    total = sum(histogram.values())
+    mean = sum(score * count for score, count in histogram.items()) / total
+    variance = sum(count * (score - mean) ** 2 for score, count in histogram.items()) / total
+    summary = {
+        "matches": total,
+        "matches_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "mean_score": mean,
+        "std_score": math.sqrt(variance),
+        "histogram": {str(score): histogram[score] for score in sorted(histogram)},
+    }
+
+    expected = analytic_round(mode)
+    if expected is not None:
+        distribution = analytic_scores(expected, match_rounds)
+        summary["analytic_mean_score"] = sum(score * p for score, p in distribution.items())
+        # Distancia de variación total entre lo medido y lo exacto
+        summary["total_variation"] = sum(
+            abs(histogram.get(score, 0) / total - distribution.get(score, 0.0))
+            for score in set(histogram) | set(distribution)
+        ) / 2
+    return summary
+
+
+def _print_rounds(mode: str, summary: dict):
+    measured = summary["measured"]
+    print(
+        f"  {mode:<11} rondas={summary['rounds']:>12,}  {summary['rounds_per_second']:>14,.0f} rondas/s  "
+        f"cpu={measured['cpu']:.4%} player={measured['player']:.4%} tie={measured['tie']:.4%}"
+    )
+    if "analytic" in summary:
+        analytic = summary["analytic"]
+        print(
+            f"  {'':<11} analítico: cpu={analytic['cpu']:.4%} player={analytic['player']:.4%} "
+            f"tie={analytic['tie']:.4%}  (z={summary['cpu_z']:+.2f})"
+        )
+    if "advertised_cpu_win" in summary:
+        print(
+            f"  {'':<11} documentado: cpu={summary['advertised_cpu_win']:.2%} "
+            f"(diferencia {measured['cpu'] - summary['advertised_cpu_win']:+.2%})"
+        )
+
+
+def _print_matches(mode: str, summary: dict):
+    line = (
+        f"  {mode:<11} partidas={summary['matches']:>10,}  {summary['matches_per_second']:>14,.0f} partidas/s  "
+        f"score medio={summary['mean_score']:+.2f} (σ={summary['std_score']:.1f})"
+    )
+    if "analytic_mean_score" in summary:
+        line += f"  analítico={summary['analytic_mean_score']:+.2f}  TV={summary['total_variation']:.5f}"
+    print(line)
+
+    total = summary["matches"]
+    widest = max(summary["histogram"].values())
+    for score, count in summary["histogram"].items():
+        bar = "█" * max(1, round(count / widest * 40)) if count else ""
+        print(f"  {'':<11} {int(score):>5} {count / total:>8.3%} {bar}")
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=False
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "workers": args.workers,
+        "seed": args.seed,
+        "player": args.player,
+        "match_rounds": args.match_rounds,
+        "session_rounds": args.session_rounds,
+        "adaptive_order": args.adaptive_order,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación Monte Carlo de los modos de juego")
+    parser.add_argument("--modes", default=",".join(MODES), help="Modos, separados por coma")
+    parser.add_argument("--rounds", type=int, default=10_000_000, help="Rondas sueltas por modo")
+    parser.add_argument("--matches", type=int, default=1_000_000, help="Partidas por modo (0 para omitir)")
+    parser.add_argument("--match-rounds", type=int, default=5, help="Rondas por partida")
+    parser.add_argument("--player", choices=PLAYERS, default="random", help="Estrategia del jugador simulado")
+    parser.add_argument("--session-rounds", type=int, default=100, help="Rondas por historial en el modo adaptativo")
+    parser.add_argument("--adaptive-order", type=int, default=2, help="Orden del predictor adaptativo")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Rondas por tarea")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de la simulación")
+    parser.add_argument("--output", default=RESULTS_DIR, help="Directorio para guardar el JSON")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Modos desconocidos: {', '.join(sorted(unknown))}")
+
+    # Una semilla independiente por tarea, derivada de --seed
+    root = np.random.SeedSequence(args.seed)
+    seeds = (int(root.spawn(1)[0].generate_state(1, np.uint64)[0]) for _ in iter(int, 1))
+    results = {"meta": _metadata(args), "modes": {}}
+
+    with multiprocessing.Pool(args.workers) as pool:
+        print("Rondas:")
+        for mode in modes:
+            tasks = _tasks("rounds", mode, args.rounds, args.chunk, seeds, args)
+            start = time.perf_counter()
+            counts = [sum(column) for column in zip(*pool.imap_unordered(_simulate, tasks))]
+            summary = summarize_rounds(mode, counts, time.perf_counter() - start)
+            results["modes"][mode] = {"rounds": summary}
+            _print_rounds(mode, summary)
+
+        if args.matches:
+            print(f"Partidas ({args.match_rounds} rondas):")
+            match_chunk = max(1, args.chunk // args.match_rounds)
+            for mode in modes:
+                tasks = _tasks("matches", mode, args.matches, match_chunk, seeds, args)
+                start = time.perf_counter()
+                histogram = {}
+                for partial in pool.imap_unordered(_simulate, tasks):
+                    for score, count in partial.items():
+                        histogram[score] = histogram.get(score, 0) + count
+                summary = summarize_matches(mode, histogram, args.match_rounds, time.perf_counter() - start)
+                results["modes"][mode]["matches"] = summary
+                _print_matches(mode, summary)
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output, f"simulate-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados guardados en {path}")
+
+
+if __name__ == "__main__":
+    main()